@@ -5,7 +5,9 @@ Generates basic chord progressions and bass lines from melody
 
 import pretty_midi
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Union
+
+from note_array import NoteArray, as_note_array
 
 
 # Common chord progressions (in scale degrees)
@@ -16,18 +18,21 @@ CHORD_PROGRESSIONS = {
     "simple": [0, 4, 5, 0],  # I-V-vi-I
 }
 
+# Accompaniment sits under the melody (velocity 80)
+CHORD_VELOCITY = 60
+BASS_VELOCITY = 70
+
 
-def detect_key_from_notes(notes: List[Tuple[float, float, int]]) -> int:
+def detect_key_from_notes(notes: NoteArray) -> int:
     """
     Simple key detection based on most common pitch class
     Returns root note (0-11)
     """
-    if not notes:
+    if len(notes) == 0:
         return 0  # Default to C
     
     # Count pitch classes
-    pitch_classes = [pitch % 12 for _, _, pitch in notes]
-    pitch_class_counts = np.bincount(pitch_classes, minlength=12)
+    pitch_class_counts = np.bincount(notes.pitch % 12, minlength=12)
     
     # Return most common pitch class as root
     return int(np.argmax(pitch_class_counts))
@@ -55,7 +60,7 @@ def get_chord_notes(root: int, chord_type: str = "major") -> List[int]:
 
 
 def generate_chord_progression(
-    melody_notes: List[Tuple[float, float, int]],
+    melody_notes: NoteArray,
     progression_type: str = "pop",
     bars: int = 4,
     tempo: int = 120
@@ -66,7 +71,7 @@ def generate_chord_progression(
     Returns:
         List of (start_time, end_time, chord_notes)
     """
-    if not melody_notes:
+    if len(melody_notes) == 0:
         return []
     
     # Detect key
@@ -76,7 +81,7 @@ def generate_chord_progression(
     progression = CHORD_PROGRESSIONS.get(progression_type, CHORD_PROGRESSIONS["simple"])
     
     # Calculate chord duration
-    total_duration = melody_notes[-1][1]  # End time of last note
+    total_duration = float(melody_notes.end[-1])  # End time of last note
     chord_duration = total_duration / len(progression)
     
     # Generate chords
@@ -102,7 +107,7 @@ def generate_chord_progression(
 def generate_bass_line(
     chords: List[Tuple[float, float, List[int]]],
     pattern: str = "root"
-) -> List[Tuple[float, float, int]]:
+) -> NoteArray:
     """
     Generate bass line from chord progression
     
@@ -137,12 +142,20 @@ def generate_bass_line(
                 note_pitch = chord_notes[i % len(chord_notes)] - 24
                 bass_notes.append((note_start, note_end, note_pitch))
     
-    return bass_notes
+    return NoteArray.from_tuples(bass_notes, velocity=BASS_VELOCITY)
+
+
+def chord_notes_to_array(chords: List[Tuple[float, float, List[int]]]) -> NoteArray:
+    """Every chord tone of a progression as one note"""
+    return NoteArray.from_tuples(
+        [(start, end, pitch) for start, end, chord_notes in chords for pitch in chord_notes],
+        velocity=CHORD_VELOCITY
+    )
 
 
 def add_accompaniment_to_midi(
     melody_midi: pretty_midi.PrettyMIDI,
-    melody_notes: List[Tuple[float, float, int]],
+    melody_notes: Union[NoteArray, List[Tuple[float, float, int]]],
     progression_type: str = "pop",
     add_chords: bool = True,
     add_bass: bool = True,
@@ -152,39 +165,16 @@ def add_accompaniment_to_midi(
     Add accompaniment to existing melody MIDI
     """
     # Generate chord progression
-    chords = generate_chord_progression(melody_notes, progression_type)
+    chords = generate_chord_progression(as_note_array(melody_notes), progression_type)
     
     # Add chord track
     if add_chords and chords:
-        chord_instrument = pretty_midi.Instrument(program=0)  # Piano
-        
-        for start, end, chord_notes in chords:
-            for pitch in chord_notes:
-                note = pretty_midi.Note(
-                    velocity=60,  # Softer than melody
-                    pitch=pitch,
-                    start=start,
-                    end=end
-                )
-                chord_instrument.notes.append(note)
-        
-        melody_midi.instruments.append(chord_instrument)
+        melody_midi.instruments.append(chord_notes_to_array(chords).to_instrument(program=0))  # Piano
     
     # Add bass track
     if add_bass and chords:
         bass_notes = generate_bass_line(chords, bass_pattern)
-        bass_instrument = pretty_midi.Instrument(program=32)  # Acoustic Bass
-        
-        for start, end, pitch in bass_notes:
-            note = pretty_midi.Note(
-                velocity=70,
-                pitch=pitch,
-                start=start,
-                end=end
-            )
-            bass_instrument.notes.append(note)
-        
-        melody_midi.instruments.append(bass_instrument)
+        melody_midi.instruments.append(bass_notes.to_instrument(program=32))  # Acoustic Bass
     
     return melody_midi
 
@@ -244,10 +234,7 @@ if __name__ == "__main__":
     midi = pretty_midi.PrettyMIDI(midi_file)
     
     # Extract melody notes
-    melody_notes = []
-    if midi.instruments:
-        for note in midi.instruments[0].notes:
-            melody_notes.append((note.start, note.end, note.pitch))
+    melody_notes = NoteArray.from_instrument(midi.instruments[0]) if midi.instruments else NoteArray.empty()
     
     # Add accompaniment
     midi_with_acc = add_accompaniment_to_midi(
@@ -0,0 +1,305 @@
+"""
+In-memory Audio Ingest
+Decodes uploaded audio straight from bytes (no temp files) into a mono
+float32 waveform, with size and duration limits and polyphase resampling.
+Shared by the humming server and the MusicGen server.
+"""
+
+import io
+import math
+import os
+import shutil
+import struct
+import subprocess
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import soundfile
+    HAS_SOUNDFILE = True
+except ImportError:
+    HAS_SOUNDFILE = False
+
+# Upload limits, overridable per call
+MAX_UPLOAD_BYTES = int(float(os.environ.get("AUDIO_MAX_UPLOAD_MB", "25")) * 2**20)
+MAX_DURATION_SECONDS = float(os.environ.get("AUDIO_MAX_DURATION_S", "300"))
+
+# Rate ffmpeg decodes to when the caller does not ask for one
+FFMPEG_DEFAULT_SR = 48000
+
+READ_CHUNK_BYTES = 1 << 20
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class AudioIngestError(ValueError):
+    """Upload rejected: too large, too long or not decodable"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+async def read_upload(upload, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """Read an UploadFile into memory, stopping as soon as it exceeds `max_bytes`"""
+    size = getattr(upload, "size", None)
+    if size is not None and size > max_bytes:
+        raise AudioIngestError(_too_large(max_bytes), status_code=413)
+
+    buffer = bytearray()
+    while True:
+        chunk = await upload.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise AudioIngestError(_too_large(max_bytes), status_code=413)
+    return bytes(buffer)
+
+
+def load_audio(
+    data: bytes,
+    target_sr: Optional[int] = None,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    max_seconds: float = MAX_DURATION_SECONDS
+) -> Tuple[np.ndarray, int]:
+    """Decode audio bytes to mono float32 and resample to `target_sr` if given"""
+    audio, sample_rate = decode_audio(data, max_bytes, max_seconds, target_sr)
+    if target_sr is not None and sample_rate != target_sr:
+        audio = resample(audio, sample_rate, target_sr)
+        sample_rate = target_sr
+    return audio, sample_rate
+
+
+def load_audio_file(
+    path: str,
+    target_sr: Optional[int] = None,
+    max_bytes: float = float("inf"),
+    max_seconds: float = float("inf")
+) -> Tuple[np.ndarray, int]:
+    """`load_audio` for a file on disk; local files have no size or duration limit unless given"""
+    with open(path, "rb") as f:
+        return load_audio(f.read(), target_sr, max_bytes, max_seconds)
+
+
+def decode_audio(
+    data: bytes,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    max_seconds: float = MAX_DURATION_SECONDS,
+    preferred_sr: Optional[int] = None
+) -> Tuple[np.ndarray, int]:
+    """
+    Decode audio bytes to a mono float32 waveform at its native rate.
+
+    PCM and float WAV are parsed directly: the samples are a view of `data`
+    and are converted and downmixed in a single pass (mono float32 WAV is
+    returned as a read-only view without copying). Other formats go through
+    soundfile, then ffmpeg over pipes (which decodes at `preferred_sr`).
+    """
+    if len(data) > max_bytes:
+        raise AudioIngestError(_too_large(max_bytes), status_code=413)
+    if len(data) == 0:
+        raise AudioIngestError("Empty audio upload")
+
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            return _decode_wav(data, max_seconds)
+        except _UnsupportedWav:
+            pass  # e.g. ADPCM; let soundfile/ffmpeg handle it
+
+    if HAS_SOUNDFILE:
+        try:
+            info = soundfile.info(io.BytesIO(data))
+        except Exception:
+            info = None
+        if info is not None:
+            _check_duration(info.frames / info.samplerate, max_seconds)
+            frames, sample_rate = soundfile.read(io.BytesIO(data), dtype="float32", always_2d=True)
+            return _downmix(frames), int(sample_rate)
+
+    if shutil.which("ffmpeg"):
+        return _decode_ffmpeg(data, preferred_sr or FFMPEG_DEFAULT_SR, max_seconds)
+
+    raise AudioIngestError("Unsupported audio format (install ffmpeg for compressed formats)", status_code=415)
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """Polyphase (FIR) resampling to `target_sr`, returned as float32"""
+    if orig_sr == target_sr:
+        return audio
+    # scipy.signal takes about a second to import; only pay for it when resampling
+    from scipy.signal import resample_poly
+    
+    g = math.gcd(int(orig_sr), int(target_sr))
+    resampled = resample_poly(audio, int(target_sr) // g, int(orig_sr) // g)
+    return resampled.astype(np.float32, copy=False)
+
+
+class StreamResampler:
+    """
+    Chunk-by-chunk `resample` for live audio.
+
+    The output matches resampling the whole stream at once: each chunk is
+    filtered together with the input the FIR filter needs on either side,
+    and output samples whose filter window is not complete yet are held
+    back until the next chunk or `flush()`.
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int):
+        g = math.gcd(int(orig_sr), int(target_sr))
+        self.up = int(target_sr) // g
+        self.down = int(orig_sr) // g
+        # resample_poly's default filter spans 10 * max(up, down) taps either
+        # side of each output at the upsampled rate
+        self.half_taps = 10 * max(self.up, self.down)
+        self.margin = -(-self.half_taps // self.up) + 1
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.base = 0
+        self.received = 0
+        self.emitted = 0
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Resampled output that no later input can change"""
+        self.buffer = np.concatenate((self.buffer, np.asarray(chunk, dtype=np.float32)))
+        self.received += len(chunk)
+        ready = ((self.received - 1) * self.up - self.half_taps) // self.down + 1
+        return self._emit(max(0, ready))
+
+    def flush(self) -> np.ndarray:
+        """Remaining output at the end of the stream"""
+        return self._emit(-(-self.received * self.up // self.down))
+
+    def _emit(self, until: int) -> np.ndarray:
+        if self.up == self.down:
+            out, self.buffer = self.buffer, self.buffer[:0]
+            return out
+        if until <= self.emitted:
+            return np.zeros(0, dtype=np.float32)
+
+        from scipy.signal import resample_poly
+
+        # `base` is a multiple of `down`, so the buffer's output grid is the stream's
+        offset = self.base * self.up // self.down
+        resampled = resample_poly(self.buffer, self.up, self.down)
+        out = resampled[self.emitted - offset:until - offset].astype(np.float32, copy=False)
+        self.emitted = until
+
+        # Keep the input the next output's filter window reaches back to
+        keep_from = max(0, until * self.down // self.up - self.margin)
+        keep_from -= keep_from % self.down
+        self.buffer = self.buffer[keep_from - self.base:]
+        self.base = keep_from
+        return out
+
+
+class _UnsupportedWav(Exception):
+    pass
+
+
+def _decode_wav(data: bytes, max_seconds: float) -> Tuple[np.ndarray, int]:
+    fmt = None
+    data_offset = data_size = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            # A truncated or undersized header is malformed, not a server error
+            if chunk_size < 16 or body + 16 > len(data):
+                raise AudioIngestError("Malformed WAV file")
+            fmt = struct.unpack_from("<HHIIHH", data, body)
+            if fmt[0] == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26 and body + 26 <= len(data):
+                # Real format tag is the first two bytes of the SubFormat GUID
+                fmt = (struct.unpack_from("<H", data, body + 24)[0],) + fmt[1:]
+        elif chunk_id == b"data":
+            data_offset = body
+            # Streamed WAVs leave the size as 0 or 0xFFFFFFFF: read to the end
+            available = len(data) - body
+            data_size = available if chunk_size in (0, 0xFFFFFFFF) else min(chunk_size, available)
+            break
+        offset = body + chunk_size + (chunk_size & 1)
+
+    if fmt is None or data_offset is None:
+        raise AudioIngestError("Malformed WAV file")
+
+    format_tag, channels, sample_rate, _, block_align, bits = fmt
+    if channels < 1 or sample_rate < 1 or block_align < 1:
+        raise AudioIngestError("Malformed WAV file")
+
+    n_frames = data_size // block_align
+    _check_duration(n_frames / sample_rate, max_seconds)
+    raw = memoryview(data)[data_offset:data_offset + n_frames * block_align]
+
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        samples = np.frombuffer(raw, dtype="<f4" if bits == 32 else "<f8")
+        scale, bias = 1.0, 0.0
+    elif format_tag == WAVE_FORMAT_PCM and bits == 8:
+        samples = np.frombuffer(raw, dtype=np.uint8)
+        scale, bias = 1.0 / 128.0, -128.0
+    elif format_tag == WAVE_FORMAT_PCM and bits == 16:
+        samples = np.frombuffer(raw, dtype="<i2")
+        scale, bias = 1.0 / 32768.0, 0.0
+    elif format_tag == WAVE_FORMAT_PCM and bits == 24:
+        # No native 24-bit dtype: widen into the top three bytes of an int32
+        packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        widened = np.zeros((len(packed), 4), dtype=np.uint8)
+        widened[:, 1:] = packed
+        samples = widened.view("<i4").ravel()
+        scale, bias = 1.0 / 2147483648.0, 0.0
+    elif format_tag == WAVE_FORMAT_PCM and bits == 32:
+        samples = np.frombuffer(raw, dtype="<i4")
+        scale, bias = 1.0 / 2147483648.0, 0.0
+    else:
+        raise _UnsupportedWav()
+
+    frames = samples.reshape(-1, channels)
+    if frames.dtype == np.float32 and channels == 1:
+        return frames[:, 0], int(sample_rate)
+
+    if channels == 1:
+        audio = np.multiply(frames[:, 0], scale, dtype=np.float32)
+    else:
+        # Sum channels straight into float32; no per-channel float copy
+        audio = frames.sum(axis=1, dtype=np.float32)
+        audio *= scale / channels
+    if bias:
+        audio += bias * scale
+    return audio, int(sample_rate)
+
+
+def _decode_ffmpeg(data: bytes, sample_rate: int, max_seconds: float) -> Tuple[np.ndarray, int]:
+    # Stop decoding just past the limit instead of decoding everything
+    limit = ["-t", str(max_seconds + 1)] if np.isfinite(max_seconds) else []
+    command = [
+        "ffmpeg", "-v", "error", "-i", "pipe:0", *limit,
+        "-f", "f32le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"
+    ]
+    result = subprocess.run(command, input=data, capture_output=True)
+    if result.returncode != 0 or not result.stdout:
+        detail = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise AudioIngestError(f"Could not decode audio: {detail[-1] if detail else 'unknown format'}", status_code=415)
+    audio = np.frombuffer(result.stdout, dtype="<f4")
+    _check_duration(len(audio) / sample_rate, max_seconds)
+    return audio, sample_rate
+
+
+def _downmix(frames: np.ndarray) -> np.ndarray:
+    if frames.shape[1] == 1:
+        return frames[:, 0]
+    return frames.mean(axis=1, dtype=np.float32)
+
+
+def _check_duration(seconds: float, max_seconds: float):
+    if seconds > max_seconds:
+        raise AudioIngestError(
+            f"Audio is {seconds:.1f}s long, the limit is {max_seconds:g}s",
+            status_code=413
+        )
+
+
+def _too_large(max_bytes: int) -> str:
+    return f"Upload exceeds the {max_bytes / 2**20:.0f} MB limit"
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Pitch backend comparison
+Runs each pitch tracker on the generate_test_audio.py melodies and reports
+accuracy against the known notes next to latency: the first call (imports
+and model loading included) and the warm cost per second of audio.
+
+Usage:
+    python bench_pitch.py
+    python bench_pitch.py --backends yin crepe:tiny crepe:full --snr 20
+    python bench_pitch.py --silence 1.5 --snr 30 --no-vad
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from audio_ingest import load_audio_file
+from generate_test_audio import generate_melody_audio
+from humming_to_midi import extract_pitch_from_audio, smooth_pitch_contour, segment_notes
+
+SR = 16000
+HOP_LENGTH = 160
+# generate_melody_audio fades each note in and out over 50 ms
+FADE_SECONDS = 0.05
+
+MELODIES = {
+    "scale": ([60, 62, 64, 65, 67, 69, 67, 65, 64, 62, 60], 0.4),
+    "low": ([45, 47, 48, 50, 52, 50, 48, 47, 45], 0.5),
+    "high": ([72, 74, 76, 79, 81, 79, 76, 74, 72], 0.3),
+    "leaps": ([55, 67, 60, 72, 57, 64, 52, 69], 0.5),
+    "fast": ([60, 64, 67, 72, 67, 64, 60, 64, 67, 72, 67, 64], 0.15)
+}
+
+
+def render_melodies(directory: str, snr_db: float = None, seed: int = 0, silence: float = 0.0) -> dict:
+    """
+    Waveforms of MELODIES at SR, optionally with white noise at `snr_db`
+    and `silence` seconds of lead-in and lead-out (noise only), like a real
+    recording
+    """
+    rng = np.random.default_rng(seed)
+    rendered = {}
+    for name, (notes, duration) in MELODIES.items():
+        path = os.path.join(directory, f"{name}.wav")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_melody_audio(notes, duration=duration, sr=SR, output_file=path)
+        audio, _ = load_audio_file(path, SR)
+        lead = np.zeros(int(silence * SR), dtype=np.float32)
+        audio = np.concatenate((lead, audio, lead))
+        if snr_db is not None:
+            noise_power = np.mean(audio[len(lead):len(audio) - len(lead)] ** 2) / 10 ** (snr_db / 10)
+            audio = (audio + rng.normal(0, np.sqrt(noise_power), len(audio))).astype(np.float32)
+        rendered[name] = (audio, notes, duration)
+    return rendered
+
+
+def score(time_, frequency, confidence, notes, duration, silence: float = 0.0) -> dict:
+    """Frame and note accuracy of one contour against the melody it was rendered from"""
+    time_ = time_ - silence
+    index = (time_ // duration).astype(int)
+    offset = time_ - index * duration
+    # Frames well inside a note, away from the fades
+    inside = (index >= 0) & (index < len(notes)) & (offset > FADE_SECONDS) & (offset < duration - FADE_SECONDS)
+    expected = np.asarray(notes)[index[inside]]
+    estimated = frequency[inside]
+    voiced = estimated > 0
+    cents = np.full(len(estimated), np.inf)
+    cents[voiced] = np.abs(1200 * np.log2(estimated[voiced] / 440.0) - 100 * (expected[voiced] - 69))
+
+    # Zero pitch tolerance: otherwise steps of a tone bridged by one transition
+    # frame merge into one note whatever the tracker, hiding its differences
+    smoothed = smooth_pitch_contour(frequency, confidence)
+    detected = segment_notes(time_, smoothed, min_note_duration=0.05, pitch_tolerance=0)
+    # A note is found when a detected note of the right pitch covers its midpoint
+    found = 0
+    for i, pitch in enumerate(notes):
+        middle = (i + 0.5) * duration
+        covering = (detected.start <= middle) & (detected.end > middle)
+        found += bool(np.any(detected.pitch[covering] == pitch))
+
+    return {
+        "raw_pitch_accuracy": float(np.mean(cents < 50)),
+        "voicing_recall": float(np.mean(voiced)),
+        "median_cents_error": float(np.median(cents[voiced])) if voiced.any() else None,
+        "note_accuracy": found / len(notes),
+        "extra_notes": max(0, len(detected) - found)
+    }
+
+
+def run_backend(
+    spec: str,
+    melodies: dict,
+    confidence_threshold: float,
+    repeats: int,
+    vad: bool = True,
+    silence: float = 0.0
+) -> dict:
+    """Accuracy per melody plus first-call and warm latency for one backend spec"""
+    backend, _, capacity = spec.partition(":")
+    capacity = capacity or "tiny"
+
+    def track(audio):
+        return extract_pitch_from_audio(
+            audio, SR, HOP_LENGTH, confidence_threshold, backend=backend, model_capacity=capacity, vad=vad
+        )
+
+    first_audio = next(iter(melodies.values()))[0]
+    start = time.perf_counter()
+    track(first_audio)
+    first_call = time.perf_counter() - start
+
+    results = {"first_call_seconds": round(first_call, 3), "melodies": {}}
+    audio_seconds = 0.0
+    warm_seconds = 0.0
+    for name, (audio, notes, duration) in melodies.items():
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            contour = track(audio)
+            times.append(time.perf_counter() - start)
+        audio_seconds += len(audio) / SR
+        warm_seconds += min(times)
+        results["melodies"][name] = score(*contour, notes, duration, silence)
+
+    for metric in ("raw_pitch_accuracy", "voicing_recall", "note_accuracy"):
+        results[metric] = round(float(np.mean([m[metric] for m in results["melodies"].values()])), 4)
+    results["ms_per_audio_second"] = round(1000 * warm_seconds / audio_seconds, 2)
+    results["realtime_factor"] = round(audio_seconds / warm_seconds, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=["yin", "pyin", "crepe:tiny", "crepe:full"],
+        help="Backends to compare; crepe takes a capacity as crepe:<capacity>"
+    )
+    parser.add_argument("--snr", type=float, default=None, help="Add white noise at this SNR in dB")
+    parser.add_argument("--silence", type=float, default=0.0, help="Seconds of lead-in and lead-out")
+    parser.add_argument("--no-vad", action="store_true", help="Track every frame instead of voiced spans only")
+    parser.add_argument("--confidence-threshold", type=float, default=0.3)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="Write the full results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        melodies = render_melodies(directory, args.snr, silence=args.silence)
+
+    results = {}
+    print("=" * 86)
+    print(f"{'backend':<14}{'pitch acc':>11}{'voicing':>10}{'notes':>9}{'first call':>13}{'ms/audio-s':>13}{'x realtime':>12}")
+    print("=" * 86)
+    for spec in args.backends:
+        try:
+            result = run_backend(
+                spec, melodies, args.confidence_threshold, args.repeats, vad=not args.no_vad, silence=args.silence
+            )
+        except ImportError as e:
+            print(f"{spec:<14}skipped: {e}")
+            results[spec] = {"error": str(e)}
+            continue
+        results[spec] = result
+        print(
+            f"{spec:<14}{result['raw_pitch_accuracy']:>11.1%}{result['voicing_recall']:>10.1%}"
+            f"{result['note_accuracy']:>9.1%}{result['first_call_seconds']:>12.2f}s"
+            f"{result['ms_per_audio_second']:>13.2f}{result['realtime_factor']:>11.0f}x"
+        )
+    print("=" * 86)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"snr_db": args.snr, "silence": args.silence, "vad": not args.no_vad, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
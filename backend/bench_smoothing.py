@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Pitch-contour smoothing micro-benchmark
+Times smooth_pitch_contour against the original per-frame loop on long
+synthetic contours (100 frames per second, as produced by CREPE with a
+10 ms hop) and checks that the "mean" filter reproduces it.
+
+Usage:
+    python bench_smoothing.py
+    python bench_smoothing.py --minutes 1 10 30 --window 7
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from humming_to_midi import SMOOTHING_METHODS, smooth_pitch_contour
+
+FRAMES_PER_SECOND = 100
+
+
+def smooth_pitch_contour_loop(frequency: np.ndarray, confidence: np.ndarray, window_size: int = 5) -> np.ndarray:
+    """The original per-frame implementation, kept as the reference"""
+    smoothed = np.copy(frequency)
+    for i in range(len(frequency)):
+        if frequency[i] > 0:
+            start = max(0, i - window_size // 2)
+            end = min(len(frequency), i + window_size // 2 + 1)
+            window = frequency[start:end]
+            conf_window = confidence[start:end]
+            valid = (window > 0) & (conf_window > 0.5)
+            if np.any(valid):
+                smoothed[i] = np.mean(window[valid])
+    return smoothed
+
+
+def synthetic_contour(seconds: float, seed: int = 0):
+    """Hummed-melody-like contour: held notes with vibrato and jitter, gaps and dropouts"""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * FRAMES_PER_SECOND)
+    note_lengths = rng.integers(10, 80, size=n // 10 + 1)
+    midi = np.repeat(rng.integers(55, 75, size=len(note_lengths)), note_lengths)[:n]
+    t = np.arange(n) / FRAMES_PER_SECOND
+    frequency = 440.0 * 2 ** ((midi - 69 + 0.3 * np.sin(2 * np.pi * 5 * t) + rng.normal(0, 0.1, n)) / 12)
+    confidence = np.clip(rng.normal(0.7, 0.2, n), 0, 1)
+    # Rests and low-confidence frames come out of extraction as 0 Hz
+    frequency[(rng.random(n) < 0.15) | (confidence < 0.3)] = 0
+    return frequency, confidence
+
+
+def best_time(fn, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 5, 20], help="Contour lengths")
+    parser.add_argument("--window", type=int, default=5, help="Smoothing window in frames")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"{'length':>8}{'frames':>10}{'loop':>12}" + "".join(f"{m:>14}" for m in SMOOTHING_METHODS))
+    print("=" * 72)
+    for minutes in args.minutes:
+        frequency, confidence = synthetic_contour(minutes * 60)
+
+        reference = smooth_pitch_contour_loop(frequency, confidence, args.window)
+        vectorized = smooth_pitch_contour(frequency, confidence, args.window)
+        if not np.allclose(reference, vectorized, rtol=1e-12, atol=0):
+            raise AssertionError("Vectorized mean filter does not match the reference loop")
+
+        loop_time = best_time(lambda: smooth_pitch_contour_loop(frequency, confidence, args.window), 1)
+        row = f"{minutes:>6g}m{len(frequency):>11}{loop_time * 1000:>10.1f}ms"
+        for method in SMOOTHING_METHODS:
+            t = best_time(lambda: smooth_pitch_contour(frequency, confidence, args.window, method), args.repeats)
+            row += f"{t * 1000:>8.1f}ms{loop_time / t:>5.0f}x"
+        print(row)
+    print("=" * 72)
+    print("Mean filter output matches the per-frame loop")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Batch Humming-to-MIDI
+Converts a directory or manifest of hummed recordings to MIDI. Files are
+decoded in parallel worker processes while the main process stacks the
+CREPE frames of several files into large inference batches, then writes
+one MIDI file per recording and a JSON manifest of the results. With the
+CPU pitch trackers (yin, pyin) the workers also track pitch.
+
+Usage:
+    python humming_batch.py recordings/ --output midi_out
+    python humming_batch.py manifest.txt --output midi_out --workers 8
+    python humming_batch.py recordings/ --output midi_out --pitch-backend yin
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from typing import Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+from audio_ingest import load_audio_file
+from humming_to_midi import (
+    CREPE_SR,
+    CREPE_FRAME_LENGTH,
+    PITCH_BACKENDS,
+    CREPE_CAPACITIES,
+    extract_pitch_from_audio,
+    voice_activity,
+    crepe_frames,
+    crepe_activation,
+    pitch_from_activation,
+    smooth_pitch_contour,
+    segment_notes,
+    create_midi_from_notes
+)
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3", ".m4a", ".aac", ".aiff", ".aif", ".webm", ".opus")
+
+# Stack at least this many CREPE frames (10 ms each) before running the model
+DEFAULT_BATCH_FRAMES = 8192
+
+
+def collect_inputs(source: Union[str, Iterable[str]]) -> List[str]:
+    """
+    Audio paths from a directory (searched recursively), a manifest or a list of paths
+
+    A manifest is either a text file with one path per line or a JSON list
+    of paths or {"path": ...} objects; relative paths are resolved against
+    the manifest's directory.
+    """
+    if not isinstance(source, str):
+        return [str(path) for path in source]
+
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(source)
+            for name in names
+            if name.lower().endswith(AUDIO_EXTENSIONS)
+        )
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as f:
+        if source.lower().endswith(".json"):
+            entries = [e["path"] if isinstance(e, dict) else e for e in json.load(f)]
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return [os.path.join(base, path) for path in entries]
+
+
+def decode_file(path: str):
+    """Worker: decode and resample one file to CREPE's rate; errors are returned, not raised"""
+    try:
+        audio, _ = load_audio_file(path, CREPE_SR)
+        return path, audio, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def track_file(path: str, backend: str, hop_length: int, confidence_threshold: float, vad: bool):
+    """Worker: decode one file and run a CPU pitch tracker on it, returning (duration, contour)"""
+    path, audio, error = decode_file(path)
+    if error is not None:
+        return path, None, error
+    try:
+        contour = extract_pitch_from_audio(audio, CREPE_SR, hop_length, confidence_threshold, backend, vad=vad)
+        return path, (len(audio) / CREPE_SR, contour), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def decoded_files(paths: List[str], pool, prefetch: int, task=decode_file, args=()) -> Iterator:
+    """`task(path, *args)` for each file in input order, keeping at most `prefetch` queued ahead"""
+    if pool is None:
+        for path in paths:
+            yield task(path, *args)
+        return
+
+    pending = deque()
+    for path in paths:
+        pending.append(pool.apply_async(task, (path, *args)))
+        if len(pending) >= prefetch:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def midi_output_path(path: str, root: str, output_dir: str) -> str:
+    relative = os.path.relpath(os.path.abspath(path), root)
+    return os.path.join(output_dir, os.path.splitext(relative)[0] + ".mid")
+
+
+def batch_audio_to_midi(
+    source: Union[str, Iterable[str]],
+    output_dir: str,
+    workers: Optional[int] = None,
+    batch_frames: int = DEFAULT_BATCH_FRAMES,
+    pitch_backend: str = "crepe",
+    model_capacity: str = "tiny",
+    viterbi: bool = True,
+    vad: bool = True,
+    confidence_threshold: float = 0.3,
+    min_note_duration: float = 0.05,
+    smooth_window: int = 5,
+    smooth_method: str = "mean",
+    step_size: float = 10.0,
+    manifest_name: str = "manifest.json",
+    verbose: bool = True
+) -> dict:
+    """
+    Convert many recordings to MIDI with CREPE inference batched across files
+    
+    `batch_frames` and `model_capacity` apply to the "crepe" backend; the
+    other backends run entirely in the worker processes. With `vad`, only
+    voiced frames are tracked (and count towards `batch_frames`).
+
+    Returns:
+        The manifest written to `output_dir`: a summary (files, audio seconds,
+        wall seconds, audio seconds per wall second) and one entry per input
+        with its MIDI path and notes, or the error that stopped it
+    """
+    if pitch_backend not in PITCH_BACKENDS:
+        raise ValueError(f"Unknown pitch backend '{pitch_backend}', expected one of {PITCH_BACKENDS}")
+    paths = collect_inputs(source)
+    os.makedirs(output_dir, exist_ok=True)
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 2) - 1)
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths]) if paths else ""
+
+    entries = {}
+    pending = []
+    pending_frames = 0
+    audio_seconds = 0.0
+    start = time.perf_counter()
+
+    def write_notes(path: str, duration: float, contour):
+        """Smooth, segment and write one file's pitch contour"""
+        try:
+            times, frequency, confidence = contour
+            frequency = smooth_pitch_contour(frequency, confidence, smooth_window, smooth_method)
+            notes = segment_notes(times, frequency, min_note_duration, confidence=confidence)
+            midi_path = midi_output_path(path, root, output_dir)
+            os.makedirs(os.path.dirname(midi_path), exist_ok=True)
+            create_midi_from_notes(notes).write(midi_path)
+            entries[path] = {
+                "path": path,
+                "midi": midi_path,
+                "duration": round(duration, 3),
+                "num_notes": len(notes),
+                "notes": notes.to_json()
+            }
+        except Exception as e:
+            entries[path] = {"path": path, "error": str(e)}
+
+    def flush():
+        """One CREPE pass over the stacked frames, then per-file decoding and MIDI"""
+        nonlocal pending, pending_frames
+        if not pending:
+            return
+        activation = crepe_activation(np.concatenate([frames for _, _, frames, _ in pending]), model_capacity)
+        offsets = np.cumsum([len(frames) for _, _, frames, _ in pending])[:-1]
+        for (path, duration, _, voiced), file_activation in zip(pending, np.split(activation, offsets)):
+            write_notes(
+                path,
+                duration,
+                pitch_from_activation(file_activation, step_size, viterbi, confidence_threshold, voiced=voiced)
+            )
+        pending = []
+        pending_frames = 0
+
+    # Workers are forked before the CREPE model is built in this process
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    pool = context.Pool(workers) if workers > 0 else None
+    hop_length = int(CREPE_SR * step_size / 1000)
+    if pitch_backend == "crepe":
+        task, args = decode_file, ()
+    else:
+        task, args = track_file, (pitch_backend, hop_length, confidence_threshold, vad)
+    try:
+        results = decoded_files(paths, pool, 4 * max(1, workers), task, args)
+        for done, (path, result, error) in enumerate(results, 1):
+            if error is not None:
+                entries[path] = {"path": path, "error": error}
+                continue
+
+            if pitch_backend != "crepe":
+                duration, contour = result
+                audio_seconds += duration
+                write_notes(path, duration, contour)
+            else:
+                duration = len(result) / CREPE_SR
+                audio_seconds += duration
+                frames = crepe_frames(result, step_size)
+                voiced = voice_activity(result, CREPE_SR, hop_length, CREPE_FRAME_LENGTH) if vad else None
+                if voiced is not None:
+                    frames = frames[voiced]
+                pending.append((path, duration, frames, voiced))
+                pending_frames += len(frames)
+                if pending_frames >= batch_frames:
+                    flush()
+
+            if verbose and done % 100 == 0:
+                elapsed = time.perf_counter() - start
+                print(f"  {done}/{len(paths)} files, {audio_seconds / elapsed:.1f} audio-s/s")
+        flush()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    wall_seconds = time.perf_counter() - start
+    files = [entries[path] for path in paths if path in entries]
+    manifest = {
+        "summary": {
+            "files": len(paths),
+            "converted": sum(1 for e in files if "error" not in e),
+            "failed": sum(1 for e in files if "error" in e),
+            "audio_seconds": round(audio_seconds, 2),
+            "wall_seconds": round(wall_seconds, 2),
+            "audio_seconds_per_second": round(audio_seconds / wall_seconds, 2) if wall_seconds > 0 else None,
+            "pitch_backend": pitch_backend,
+            "model_capacity": model_capacity,
+            "workers": workers,
+            "batch_frames": batch_frames,
+            "vad": vad
+        },
+        "files": files
+    }
+    with open(os.path.join(output_dir, manifest_name), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Directory of recordings, or a manifest (.txt or .json)")
+    parser.add_argument("--output", required=True, help="Directory for MIDI files and manifest.json")
+    parser.add_argument("--workers", type=int, default=None, help="Decode processes (0 decodes inline)")
+    parser.add_argument("--batch-frames", type=int, default=DEFAULT_BATCH_FRAMES, help="CREPE frames per model call")
+    parser.add_argument("--pitch-backend", default="crepe", choices=PITCH_BACKENDS)
+    parser.add_argument("--model-capacity", default="tiny", choices=CREPE_CAPACITIES)
+    parser.add_argument("--confidence-threshold", type=float, default=0.3)
+    parser.add_argument("--min-note-duration", type=float, default=0.05)
+    parser.add_argument("--smooth-window", type=int, default=5)
+    parser.add_argument("--smooth-method", default="mean", choices=["mean", "median", "cents"])
+    parser.add_argument("--no-viterbi", action="store_true", help="Local-average decoding instead of Viterbi")
+    parser.add_argument("--no-vad", action="store_true", help="Track every frame, including silence")
+    args = parser.parse_args()
+
+    print(f"Converting {args.source} -> {args.output}...")
+    manifest = batch_audio_to_midi(
+        args.source,
+        args.output,
+        workers=args.workers,
+        batch_frames=args.batch_frames,
+        pitch_backend=args.pitch_backend,
+        model_capacity=args.model_capacity,
+        viterbi=not args.no_viterbi,
+        vad=not args.no_vad,
+        confidence_threshold=args.confidence_threshold,
+        min_note_duration=args.min_note_duration,
+        smooth_window=args.smooth_window,
+        smooth_method=args.smooth_method
+    )
+
+    summary = manifest["summary"]
+    print(f"\n✓ {summary['converted']}/{summary['files']} files converted ({summary['failed']} failed)")
+    print(
+        f"  {summary['audio_seconds']:.1f}s of audio in {summary['wall_seconds']:.1f}s: "
+        f"{summary['audio_seconds_per_second']} audio-seconds per second"
+    )
+    print(f"  Manifest: {os.path.join(args.output, 'manifest.json')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,34 @@
 FastAPI Server for Humming-to-Music Pipeline
 """
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+import time
+
+IMPORT_TIME = time.time()
+
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import os
-import tempfile
-import shutil
+import io
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 import json
 
-from humming_to_midi import audio_to_midi, midi_to_bytes
+import numpy as np
+
+# Heavy dependencies (scipy.signal, CREPE/TensorFlow, librosa) are imported
+# inside these modules on first use, and loaded ahead of time by the warmup
+from audio_ingest import AudioIngestError, MAX_UPLOAD_BYTES, MAX_DURATION_SECONDS, read_upload, load_audio
+from humming_to_midi import (
+    PITCH_BACKENDS,
+    audio_to_midi,
+    midi_to_bytes,
+    create_midi_from_notes
+)
+from note_array import NoteArray
+from humming_stream import StreamingTranscriber
+from process_info import process_start_time
 from accompaniment_generator import (
     add_accompaniment_to_midi,
     synthesize_midi_to_audio
@@ -33,6 +50,115 @@ app.add_middleware(
 OUTPUT_DIR = Path("outputs")
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+# Sample rate the pitch tracker works at
+PITCH_SR = 16000
+
+# Pitch backends and CREPE capacities to load and run once at startup, so the
+# first request after a restart does not pay for imports, model building and
+# JIT compilation ("" disables the warmup)
+WARMUP_BACKENDS = [b for b in os.environ.get("HUMMING_WARMUP_BACKENDS", ",".join(PITCH_BACKENDS)).split(",") if b]
+WARMUP_CAPACITIES = [c for c in os.environ.get("HUMMING_WARMUP_CAPACITIES", "tiny").split(",") if c]
+
+
+# Cold start progress for /: starting -> warming_up -> ready, or degraded when
+# a warmup step failed (ready_backends lists the pitch backends that work), or failed
+PROCESS_START = process_start_time(fallback=IMPORT_TIME)
+startup = {
+    "phase": "starting",
+    "loaded_seconds": None,
+    "warmup_seconds": {},
+    "ready_seconds": None,
+    "ready_backends": [],
+    "errors": {},
+    "error": None
+}
+
+
+def warmup_audio(seconds: float = 1.0, sample_rate: int = 44100) -> np.ndarray:
+    """A hummed A3 with vibrato: voiced enough to exercise every pipeline stage"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    phase = 2 * np.pi * 220 * t + 0.3 * np.sin(2 * np.pi * 5 * t)
+    return (0.3 * np.sin(phase)).astype(np.float32)
+
+
+def warmup_pipeline(backends, capacities):
+    """Run each stage once so imports, model builds and JIT compilation happen before the first request"""
+    import soundfile as sf
+    
+    def step(name, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            # e.g. crepe not installed: the other backends still serve requests
+            print(f"[Startup] Warmup step {name} failed: {e}")
+            startup["errors"][name] = str(e)
+        finally:
+            startup["warmup_seconds"][name] = round(time.perf_counter() - start, 3)
+    
+    # Upload path: WAV decode and polyphase resampling from a typical browser rate
+    buffer = io.BytesIO()
+    sf.write(buffer, warmup_audio(), 44100, format="WAV")
+    decoded = step("decode_resample", load_audio, buffer.getvalue(), target_sr=PITCH_SR)
+    audio = decoded[0] if decoded is not None else warmup_audio(sample_rate=PITCH_SR)
+    
+    for backend in backends:
+        for capacity in capacities if backend == "crepe" else [None]:
+            name = f"crepe:{capacity}" if capacity else backend
+            kwargs = {"model_capacity": capacity} if capacity else {}
+            if step(name, audio_to_midi, audio, pitch_backend=backend, **kwargs) is not None:
+                startup["ready_backends"].append(name)
+    
+    def stream_and_write():
+        transcriber = StreamingTranscriber(sample_rate=44100)
+        for chunk in np.array_split(warmup_audio(), 10):
+            transcriber.feed(chunk)
+        transcriber.finish()
+        midi_to_bytes(create_midi_from_notes(transcriber.all_notes()))
+    
+    step("stream", stream_and_write)
+
+
+@app.on_event("startup")
+async def start_warmup():
+    """Warm up in the background so / answers (with ready=false) while models load"""
+    # Interpreter start and imports, up to the app starting
+    startup["loaded_seconds"] = round(time.time() - PROCESS_START, 2)
+    asyncio.ensure_future(warm_up())
+
+
+async def warm_up():
+    """Run the warmup, then report ready, or degraded if a step failed; anything else fails startup"""
+    try:
+        startup["phase"] = "warming_up"
+        if WARMUP_BACKENDS:
+            await asyncio.get_running_loop().run_in_executor(None, warmup_pipeline, WARMUP_BACKENDS, WARMUP_CAPACITIES)
+    except Exception as e:
+        print(f"[Startup] Warmup failed: {e}")
+        import traceback
+        traceback.print_exc()
+        startup["phase"] = "failed"
+        startup["error"] = str(e)
+        return
+    
+    startup["ready_seconds"] = round(time.time() - PROCESS_START, 2)
+    # A broken step (e.g. crepe not installed) must keep load balancers away
+    startup["phase"] = "degraded" if startup["errors"] else "ready"
+    print(
+        f"[Startup] {startup['phase'].capitalize()} {startup['ready_seconds']}s after process start "
+        f"({len(startup['errors'])} warmup errors, backends: {', '.join(startup['ready_backends']) or 'none'})"
+    )
+
+
+async def read_audio_upload(audio_file: UploadFile):
+    """Decode an uploaded recording in memory to mono audio at PITCH_SR"""
+    try:
+        audio_bytes = await read_upload(audio_file, MAX_UPLOAD_BYTES)
+        audio, _ = load_audio(audio_bytes, PITCH_SR, MAX_UPLOAD_BYTES, MAX_DURATION_SECONDS)
+    except AudioIngestError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return audio
+
 
 @app.get("/")
 async def root():
@@ -40,9 +166,12 @@ async def root():
         "message": "Humming-to-Music API",
         "endpoints": {
             "/extract-melody": "Extract MIDI from humming audio",
+            "/ws/extract-melody": "Stream PCM while humming, receive notes as they end (WebSocket)",
             "/add-accompaniment": "Add chords and bass to melody",
             "/synthesize": "Convert MIDI to audio"
-        }
+        },
+        "ready": startup["phase"] == "ready",
+        "startup": startup
     }
 
 
@@ -51,27 +180,38 @@ async def extract_melody(
     audio_file: UploadFile = File(...),
     confidence_threshold: float = Form(0.3),
     min_note_duration: float = Form(0.05),
-    smooth_window: int = Form(5)
+    smooth_window: int = Form(5),
+    smooth_method: Literal["mean", "median", "cents"] = Form("mean"),
+    pitch_backend: Literal["crepe", "pyin", "yin"] = Form("crepe"),
+    model_capacity: Literal["tiny", "small", "medium", "large", "full"] = Form("tiny"),
+    vad: bool = Form(True)
 ):
     """
     Extract melody from humming audio
     
+    Args:
+        pitch_backend: "crepe" (most accurate), "pyin" or "yin" (fastest)
+        model_capacity: CREPE model size
+        vad: Skip frames the voice activity detector finds silent; false
+            tracks every frame, matching /ws/extract-melody
+    
     Returns:
         - notes: List of detected notes with timing
         - midi_url: URL to download MIDI file
     """
-    # Save uploaded file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_audio:
-        shutil.copyfileobj(audio_file.file, tmp_audio)
-        tmp_audio_path = tmp_audio.name
+    audio = await read_audio_upload(audio_file)
     
     try:
         # Process audio
-        midi, notes_data = audio_to_midi(
-            tmp_audio_path,
+        midi, notes = audio_to_midi(
+            audio,
             confidence_threshold=confidence_threshold,
             min_note_duration=min_note_duration,
-            smooth_window=smooth_window
+            smooth_window=smooth_window,
+            smooth_method=smooth_method,
+            pitch_backend=pitch_backend,
+            model_capacity=model_capacity,
+            vad=vad
         )
         
         # Save MIDI
@@ -81,18 +221,113 @@ async def extract_melody(
         
         return JSONResponse({
             "success": True,
-            "notes": notes_data,
+            "notes": notes.to_json(),
             "midi_url": f"/download/{midi_filename}",
-            "num_notes": len(notes_data)
+            "num_notes": len(notes)
         })
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+
+
+# Sample formats accepted by the streaming endpoint (little-endian mono PCM)
+PCM_DTYPES = {"f32": np.dtype("<f4"), "s16": np.dtype("<i2")}
+
+
+@app.websocket("/ws/extract-melody")
+async def extract_melody_stream(
+    websocket: WebSocket,
+    sample_rate: int = 16000,
+    encoding: Literal["f32", "s16"] = "f32",
+    confidence_threshold: float = 0.3,
+    min_note_duration: float = 0.05,
+    smooth_window: int = 5,
+    smooth_method: Literal["mean", "median", "cents"] = "mean",
+    pitch_backend: Literal["yin", "crepe"] = "yin",
+    model_capacity: Literal["tiny", "small", "medium", "large", "full"] = "tiny"
+):
+    """
+    Streaming melody extraction
+    
+    Send binary messages of mono PCM (`encoding` at `sample_rate`) while the
+    user hums, then the text message "end". The server replies with
+    {"type": "notes", "notes": [...]} as soon as notes are finalized and
+    finishes with {"type": "done", "notes": [...all notes], "midi_url": ...}.
+    Errors are sent as {"type": "error", "detail": ...} before closing.
+    """
+    await websocket.accept()
+    
+    try:
+        transcriber = StreamingTranscriber(
+            sample_rate=sample_rate,
+            pitch_backend=pitch_backend,
+            model_capacity=model_capacity,
+            confidence_threshold=confidence_threshold,
+            min_note_duration=min_note_duration,
+            smooth_window=smooth_window,
+            smooth_method=smooth_method
+        )
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1008)
+        return
+    dtype = PCM_DTYPES[encoding]
+    scale = 1 / 32768 if encoding == "s16" else 1.0
+    
+    await websocket.send_json({"type": "ready", "sample_rate": sample_rate, "encoding": encoding})
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            
+            if message.get("bytes") is not None:
+                data = message["bytes"]
+                if len(data) % dtype.itemsize:
+                    await websocket.send_json({"type": "error", "detail": f"Chunk is not a whole number of {encoding} samples"})
+                    await websocket.close(code=1003)
+                    return
+                chunk = np.frombuffer(data, dtype=dtype).astype(np.float32) * scale
+                if transcriber.duration + len(chunk) / sample_rate > MAX_DURATION_SECONDS:
+                    await websocket.send_json({"type": "error", "detail": f"Stream longer than {MAX_DURATION_SECONDS:g}s"})
+                    await websocket.close(code=1008)
+                    return
+                # Pitch tracking runs off the event loop; chunks of one stream stay in order
+                notes = await asyncio.to_thread(transcriber.feed, chunk)
+            elif message.get("text", "").strip() == "end":
+                break
+            else:
+                continue
+            
+            if len(notes):
+                await websocket.send_json({"type": "notes", "notes": notes.to_json()})
+        
+        notes = await asyncio.to_thread(transcriber.finish)
+        if len(notes):
+            await websocket.send_json({"type": "notes", "notes": notes.to_json()})
+        
+        all_notes = transcriber.all_notes()
+        midi_filename = f"melody_{os.urandom(8).hex()}.mid"
+        create_midi_from_notes(all_notes).write(str(OUTPUT_DIR / midi_filename))
+        
+        await websocket.send_json({
+            "type": "done",
+            "notes": all_notes.to_json(),
+            "num_notes": len(all_notes),
+            "duration": round(transcriber.duration, 3),
+            "midi_url": f"/download/{midi_filename}"
+        })
+        await websocket.close()
     
-    finally:
-        # Cleanup temp file
-        if os.path.exists(tmp_audio_path):
-            os.unlink(tmp_audio_path)
+    except WebSocketDisconnect:
+        return
+    except Exception as e:
+        print(f"[StreamMelody] Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        await websocket.send_json({"type": "error", "detail": f"Processing failed: {str(e)}"})
+        await websocket.close(code=1011)
 
 
 @app.post("/add-accompaniment")
@@ -114,20 +349,14 @@ async def add_accompaniment(
     """
     import pretty_midi
     
-    # Save uploaded MIDI
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mid") as tmp_midi:
-        shutil.copyfileobj(midi_file.file, tmp_midi)
-        tmp_midi_path = tmp_midi.name
+    midi_bytes = await midi_file.read()
     
     try:
         # Load MIDI
-        midi = pretty_midi.PrettyMIDI(tmp_midi_path)
+        midi = pretty_midi.PrettyMIDI(io.BytesIO(midi_bytes))
         
         # Extract melody notes
-        melody_notes = []
-        if midi.instruments:
-            for note in midi.instruments[0].notes:
-                melody_notes.append((note.start, note.end, note.pitch))
+        melody_notes = NoteArray.from_instrument(midi.instruments[0]) if midi.instruments else NoteArray.empty()
         
         # Add accompaniment
         midi_with_acc = add_accompaniment_to_midi(
@@ -163,10 +392,6 @@ async def add_accompaniment(
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
-    
-    finally:
-        if os.path.exists(tmp_midi_path):
-            os.unlink(tmp_midi_path)
 
 
 @app.post("/humming-to-music")
@@ -175,30 +400,31 @@ async def humming_to_music(
     add_accompaniment: bool = Form(True),
     progression_type: str = Form("pop"),
     bass_pattern: str = Form("root"),
-    confidence_threshold: float = Form(0.3)
+    confidence_threshold: float = Form(0.3),
+    pitch_backend: Literal["crepe", "pyin", "yin"] = Form("crepe"),
+    model_capacity: Literal["tiny", "small", "medium", "large", "full"] = Form("tiny")
 ):
     """
     Complete pipeline: humming audio -> melody + accompaniment
     """
     import pretty_midi
     
-    # Save uploaded file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_audio:
-        shutil.copyfileobj(audio_file.file, tmp_audio)
-        tmp_audio_path = tmp_audio.name
+    audio = await read_audio_upload(audio_file)
     
     try:
         print(f"[HummingToMusic] Processing audio file: {audio_file.filename}")
         
         # Extract melody
-        midi, notes_data = audio_to_midi(
-            tmp_audio_path,
-            confidence_threshold=confidence_threshold
+        midi, notes = audio_to_midi(
+            audio,
+            confidence_threshold=confidence_threshold,
+            pitch_backend=pitch_backend,
+            model_capacity=model_capacity
         )
         
-        print(f"[HummingToMusic] Extracted {len(notes_data)} notes")
+        print(f"[HummingToMusic] Extracted {len(notes)} notes")
         
-        if not notes_data or len(notes_data) == 0:
+        if len(notes) == 0:
             # Return a more helpful error with suggestions
             return JSONResponse({
                 "success": False,
@@ -208,11 +434,10 @@ async def humming_to_music(
             }, status_code=400)
         
         # Add accompaniment if requested
-        if add_accompaniment and notes_data:
-            melody_notes = [(n["start"], n["end"], n["pitch"]) for n in notes_data]
+        if add_accompaniment:
             midi = add_accompaniment_to_midi(
                 midi,
-                melody_notes,
+                notes,
                 progression_type=progression_type,
                 add_chords=True,
                 add_bass=True,
@@ -235,9 +460,9 @@ async def humming_to_music(
         
         response_data = {
             "success": True,
-            "notes": notes_data,
+            "notes": notes.to_json(),
             "midi_url": f"/download/{midi_filename}",
-            "num_notes": len(notes_data),
+            "num_notes": len(notes),
             "num_tracks": len(midi.instruments)
         }
         
@@ -256,10 +481,6 @@ async def humming_to_music(
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
-    
-    finally:
-        if os.path.exists(tmp_audio_path):
-            os.unlink(tmp_audio_path)
 
 
 @app.get("/download/{filename}")
@@ -280,8 +501,6 @@ async def download_file(filename: str):
 @app.delete("/cleanup")
 async def cleanup_old_files(max_age_hours: int = 24):
     """Clean up old generated files"""
-    import time
-    
     current_time = time.time()
     deleted_count = 0
     
@@ -0,0 +1,210 @@
+"""
+Streaming Humming-to-MIDI
+Incremental pitch tracking and note segmentation over live audio chunks,
+so notes can be sent to the client as soon as they end instead of after
+the whole recording has been uploaded.
+"""
+
+from typing import List
+
+import numpy as np
+
+from audio_ingest import StreamResampler
+from note_array import NoteArray
+from humming_to_midi import (
+    CREPE_SR,
+    CREPE_FRAME_LENGTH,
+    YIN_FRAME_SECONDS,
+    crepe_frames,
+    crepe_activation,
+    pitch_from_activation,
+    yin_pitch,
+    smooth_pitch_contour,
+    segment_runs,
+    runs_to_notes
+)
+
+# Frame-local trackers only: pyin decodes the whole contour at once
+STREAM_BACKENDS = ("yin", "crepe")
+
+
+class StreamingTranscriber:
+    """
+    Humming-to-MIDI over a stream of audio chunks.
+
+    `feed(chunk)` returns the notes that chunk finalized and `finish()` the
+    rest. Each stage emits only what later audio can no longer change and
+    carries the context it needs into the next chunk: the audio of the
+    current partial frame, the last `smooth_window // 2` frames of the
+    contour, and the note still sounding. Notes arrive one frame, half a
+    smoothing window and one chunk after they end.
+
+    They match audio_to_midi over the whole recording with the same
+    settings and `vad=False` (for CREPE, the offline pipeline with
+    local-average decoding). audio_to_midi's defaults differ on both:
+    voice activity detection scales its threshold to the loudest frame of
+    the recording, and Viterbi decoding needs the whole contour, so
+    neither can run incrementally. Its notes may then differ around quiet
+    passages and, for CREPE, where the two decoders disagree.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = CREPE_SR,
+        pitch_backend: str = "yin",
+        model_capacity: str = "tiny",
+        confidence_threshold: float = 0.3,
+        min_note_duration: float = 0.05,
+        smooth_window: int = 5,
+        smooth_method: str = "mean",
+        hop_length: int = 160
+    ):
+        if pitch_backend not in STREAM_BACKENDS:
+            raise ValueError(f"Pitch backend '{pitch_backend}' cannot stream, expected one of {STREAM_BACKENDS}")
+
+        self.sr = CREPE_SR
+        self.pitch_backend = pitch_backend
+        self.model_capacity = model_capacity
+        self.confidence_threshold = confidence_threshold
+        self.min_note_duration = min_note_duration
+        self.smooth_window = smooth_window
+        self.smooth_method = smooth_method
+        self.hop_length = hop_length
+        self.half = smooth_window // 2
+        self.resampler = StreamResampler(sample_rate, self.sr) if sample_rate != self.sr else None
+        if pitch_backend == "crepe":
+            self.frame_length = CREPE_FRAME_LENGTH
+        else:
+            self.frame_length = int(self.sr * YIN_FRAME_SECONDS)
+
+        # Audio not yet consumed by a frame; starts with the centring pad
+        self.audio = np.zeros(self.frame_length // 2, dtype=np.float32)
+        self.audio_start = 0
+        self.samples = 0
+        self.finished = False
+
+        # Contour from frame `base` on: pitch for every tracked frame,
+        # smoothed pitch up to frame `smoothed_until`
+        self.base = 0
+        self.frequency = np.zeros(0)
+        self.confidence = np.zeros(0)
+        self.smoothed = np.zeros(0)
+        self.smoothed_until = 0
+        # Segmentation restarts here: the start of the note still sounding
+        self.segment_start = 0
+
+        self.notes: List[NoteArray] = []
+
+    @property
+    def duration(self) -> float:
+        """Seconds of audio received"""
+        return self.samples / self.sr
+
+    def feed(self, chunk: np.ndarray) -> NoteArray:
+        """Add mono audio at the stream's sample rate; returns newly finalized notes"""
+        if self.finished:
+            raise RuntimeError("Stream already finished")
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if self.resampler is not None:
+            chunk = self.resampler.process(chunk)
+        return self._advance(chunk, final=False)
+
+    def finish(self) -> NoteArray:
+        """End of stream: returns the remaining notes"""
+        if self.finished:
+            return NoteArray.empty()
+        tail = self.resampler.flush() if self.resampler is not None else np.zeros(0, dtype=np.float32)
+        notes = self._advance(tail, final=True)
+        self.finished = True
+        return notes
+
+    def all_notes(self) -> NoteArray:
+        """Every note finalized so far, in order"""
+        return NoteArray.concatenate(self.notes)
+
+    def _advance(self, chunk: np.ndarray, final: bool) -> NoteArray:
+        self.samples += len(chunk)
+        self.audio = np.concatenate((self.audio, chunk))
+        if final:
+            self.audio = np.concatenate((self.audio, np.zeros(self.frame_length // 2, dtype=np.float32)))
+
+        self._track_frames()
+        self._smooth(final)
+        notes = self._segment(final)
+        self._trim()
+        if len(notes):
+            self.notes.append(notes)
+        return notes
+
+    def _track_frames(self):
+        """Pitch for every frame whose window is now complete"""
+        tracked = self.base + len(self.frequency)
+        available = self.audio_start + len(self.audio)
+        if available < self.frame_length:
+            return
+        total = (available - self.frame_length) // self.hop_length + 1
+        if total <= tracked:
+            return
+
+        # self.audio starts at the first sample of frame `tracked`
+        window = self.audio[:(total - 1 - tracked) * self.hop_length + self.frame_length]
+        if self.pitch_backend == "crepe":
+            step_size = self.hop_length / self.sr * 1000
+            activation = crepe_activation(crepe_frames(window, step_size, center=False), self.model_capacity)
+            _, frequency, confidence = pitch_from_activation(activation, step_size, viterbi=False, confidence_threshold=0.0)
+        else:
+            _, frequency, confidence = yin_pitch(window, self.sr, self.hop_length, center=False)
+        frequency[confidence < self.confidence_threshold] = 0
+
+        self.frequency = np.concatenate((self.frequency, frequency))
+        self.confidence = np.concatenate((self.confidence, confidence))
+        consumed = (total - tracked) * self.hop_length
+        self.audio = self.audio[consumed:]
+        self.audio_start += consumed
+
+    def _smooth(self, final: bool):
+        """Smoothed pitch for frames whose whole smoothing window has been tracked"""
+        tracked = self.base + len(self.frequency)
+        until = tracked if final else tracked - self.half
+        if until <= self.smoothed_until:
+            return
+        # Left context so the window of the first new frame is complete
+        lo = max(self.base, self.smoothed_until - self.half)
+        smoothed = smooth_pitch_contour(
+            self.frequency[lo - self.base:tracked - self.base],
+            self.confidence[lo - self.base:tracked - self.base],
+            window_size=self.smooth_window,
+            method=self.smooth_method
+        )
+        self.smoothed = np.concatenate(
+            (self.smoothed, smoothed[self.smoothed_until - lo:until - lo])
+        )
+        self.smoothed_until = until
+
+    def _segment(self, final: bool) -> NoteArray:
+        """Notes that ended within the smoothed contour"""
+        lo, hi = self.segment_start - self.base, self.smoothed_until - self.base
+        starts, stops, pitches = segment_runs(self.smoothed[lo:hi])
+        if not final and len(starts) and stops[-1] == hi - lo:
+            # Still sounding: segmentation resumes from its first frame
+            self.segment_start += int(starts[-1])
+            starts, stops, pitches = starts[:-1], stops[:-1], pitches[:-1]
+        else:
+            self.segment_start = self.smoothed_until
+
+        time = (self.base + lo + np.arange(hi - lo)) * self.hop_length / self.sr
+        return runs_to_notes(
+            time, starts, stops, pitches,
+            min_note_duration=self.min_note_duration,
+            confidence=self.confidence[lo:hi]
+        )
+
+    def _trim(self):
+        """Drop contour frames no later stage will look at again"""
+        keep_from = min(self.segment_start, self.smoothed_until - self.half)
+        drop = max(0, keep_from - self.base)
+        if drop:
+            self.frequency = self.frequency[drop:]
+            self.confidence = self.confidence[drop:]
+            self.smoothed = self.smoothed[drop:]
+            self.base += drop
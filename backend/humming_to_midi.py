@@ -4,38 +4,360 @@ Extracts pitch from humming audio and converts to MIDI notes
 """
 
 import numpy as np
-import librosa
-import crepe
+from numpy.lib.stride_tricks import sliding_window_view
 import pretty_midi
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Union
 import io
 
+from audio_ingest import load_audio_file, resample
+from note_array import NoteArray, as_note_array
+
+
+# Pitch trackers selectable per request; all return (time, frequency, confidence)
+PITCH_BACKENDS = ("crepe", "pyin", "yin")
+CREPE_CAPACITIES = ("tiny", "small", "medium", "large", "full")
+
+# CREPE works on 1024-sample frames of 16 kHz audio
+CREPE_SR = 16000
+CREPE_FRAME_LENGTH = 1024
+# Frames per forward pass (crepe.predict uses Keras' default of 32)
+CREPE_BATCH_SIZE = 512
+
+# Search range of the autocorrelation trackers: C2 to B5 covers hummed melodies
+PITCH_FMIN = 65.0
+PITCH_FMAX = 1000.0
+# 64 ms analysis frames (1024 samples at 16 kHz), long enough for two periods of PITCH_FMIN
+YIN_FRAME_SECONDS = 0.064
+# Threshold on the cumulative mean normalized difference for the first dip
+YIN_THRESHOLD = 0.15
+# Frames below this RMS are reported as unvoiced
+YIN_SILENCE_RMS = 1e-3
+# Frames per FFT block, bounding memory on long recordings
+YIN_CHUNK_FRAMES = 1024
+
+# Voice activity gating: the pitch model only runs on frames within
+# VAD_RANGE_DB of the loudest one (and above VAD_MIN_RMS, about -60 dBFS)
+# whose zero-crossing rate is hum-like rather than noise- or breath-like
+VAD_RANGE_DB = 35.0
+VAD_MIN_RMS = 1e-3
+VAD_MAX_CROSSINGS_PER_SECOND = 4000
+# Context kept around detections (onsets, decays) and longest pause bridged
+VAD_PAD_SECONDS = 0.1
+VAD_MIN_GAP_SECONDS = 0.2
+
+
+def voiced_spans(voiced: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """First frame and end (exclusive) of each run of True in a frame mask"""
+    edges = np.diff(np.concatenate(([0], np.asarray(voiced, dtype=np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def voice_activity(
+    audio: np.ndarray,
+    sr: int = 16000,
+    hop_length: int = 160,
+    frame_length: int = CREPE_FRAME_LENGTH,
+    center: bool = True
+) -> np.ndarray:
+    """
+    Mask of the frames worth running a pitch model on
+    
+    Frames are windows of `frame_length` every `hop_length` samples,
+    centred unless `center=False`, on the same grid as the pitch trackers
+    with the same setting. A frame is active when
+    its energy and zero-crossing rate look like humming; detections are
+    widened by VAD_PAD_SECONDS and pauses shorter than VAD_MIN_GAP_SECONDS
+    are bridged, so notes keep their edges and phrases stay in one span.
+    """
+    audio = np.asarray(audio, dtype=np.float64)
+    if center:
+        audio = np.pad(audio, frame_length // 2)
+    n_frames = max(0, 1 + (len(audio) - frame_length) // hop_length)
+    if n_frames == 0:
+        return np.zeros(0, dtype=bool)
+    starts = np.arange(n_frames) * hop_length
+    
+    # Per-frame RMS and zero crossings from running sums, O(samples)
+    energy = np.concatenate(([0.0], np.cumsum(audio ** 2)))
+    rms = np.sqrt(np.maximum(energy[starts + frame_length] - energy[starts], 0) / frame_length)
+    signs = np.signbit(audio)
+    crossings = np.concatenate(([0], np.cumsum(signs[1:] != signs[:-1])))
+    crossing_rate = (crossings[starts + frame_length - 1] - crossings[starts]) * sr / (frame_length - 1)
+    
+    threshold = max(VAD_MIN_RMS, rms.max() * 10 ** (-VAD_RANGE_DB / 20))
+    active = (rms > threshold) & (crossing_rate < VAD_MAX_CROSSINGS_PER_SECOND)
+    
+    # Widen each detection by the context padding on both sides
+    pad = int(round(VAD_PAD_SECONDS * sr / hop_length))
+    counts = np.concatenate(([0], np.cumsum(active)))
+    frames = np.arange(n_frames)
+    voiced = counts[np.minimum(frames + pad + 1, n_frames)] - counts[np.maximum(frames - pad, 0)] > 0
+    
+    # Bridge short pauses
+    span_starts, span_stops = voiced_spans(voiced)
+    min_gap = int(round(VAD_MIN_GAP_SECONDS * sr / hop_length))
+    for stop, start in zip(span_stops[:-1].tolist(), span_starts[1:].tolist()):
+        if start - stop < min_gap:
+            voiced[stop:start] = True
+    return voiced
+
+
+def crepe_frames(audio: np.ndarray, step_size: float = 10.0, center: bool = True) -> np.ndarray:
+    """
+    Normalized CREPE input frames for a 16 kHz waveform, one row per step
+    
+    Same framing as crepe.get_activation (centred, zero-mean, unit-variance
+    frames), so frames of several files can be stacked into one batch.
+    With `center=False` the first frame starts at the first sample, for
+    callers that pad the audio themselves (e.g. when streaming).
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if center:
+        audio = np.pad(audio, CREPE_FRAME_LENGTH // 2)
+    hop_length = int(CREPE_SR * step_size / 1000)
+    frames = sliding_window_view(audio, CREPE_FRAME_LENGTH)[::hop_length].copy()
+    frames -= np.mean(frames, axis=1)[:, np.newaxis]
+    frames /= np.clip(np.std(frames, axis=1)[:, np.newaxis], 1e-8, None)
+    return frames
+
+
+def crepe_activation(frames: np.ndarray, model_capacity: str = "tiny") -> np.ndarray:
+    """CREPE pitch salience (frames x 360 bins); the model is built once per process"""
+    # Imported on first use: crepe pulls in TensorFlow
+    import crepe.core
+    
+    if len(frames) == 0:
+        return np.zeros((0, 360), dtype=np.float32)
+    model = crepe.core.build_and_load_model(model_capacity)
+    return model.predict(frames, batch_size=CREPE_BATCH_SIZE, verbose=0)
+
+
+def pitch_from_activation(
+    activation: np.ndarray,
+    step_size: float = 10.0,
+    viterbi: bool = True,
+    confidence_threshold: float = 0.3,
+    voiced: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decode CREPE salience to (time, frequency, confidence) as crepe.predict does
+    
+    With a `voiced` frame mask (see voice_activity), `activation` holds the
+    voiced frames only: each voiced span is decoded on its own and every
+    other frame comes out as 0 Hz with confidence 0.
+    """
+    import crepe.core
+    
+    if voiced is not None:
+        frequency = np.zeros(len(voiced))
+        confidence = np.zeros(len(voiced))
+        offset = 0
+        for start, stop in zip(*voiced_spans(voiced)):
+            span = activation[offset:offset + stop - start]
+            offset += stop - start
+            _, frequency[start:stop], confidence[start:stop] = pitch_from_activation(
+                span, step_size, viterbi, confidence_threshold
+            )
+        return np.arange(len(voiced)) * step_size / 1000.0, frequency, confidence
+    
+    confidence = activation.max(axis=1)
+    if viterbi:
+        cents = crepe.core.to_viterbi_cents(activation)
+    else:
+        cents = crepe.core.to_local_average_cents(activation)
+    frequency = 10 * 2 ** (cents / 1200)
+    frequency[np.isnan(frequency)] = 0
+    time = np.arange(confidence.shape[0]) * step_size / 1000.0
+    
+    # Filter out low-confidence predictions
+    frequency[confidence < confidence_threshold] = 0
+    
+    return time, frequency, confidence
+
+
+def crepe_pitch(
+    audio: np.ndarray,
+    sr: int = 16000,
+    hop_length: int = 160,
+    model_capacity: str = "tiny",
+    viterbi: bool = True,
+    vad: bool = False
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """CREPE pitch tracking; confidence is the peak salience of each frame"""
+    if model_capacity not in CREPE_CAPACITIES:
+        raise ValueError(f"Unknown CREPE capacity '{model_capacity}', expected one of {CREPE_CAPACITIES}")
+    
+    step_size = hop_length / sr * 1000  # Convert to milliseconds
+    if sr != CREPE_SR:
+        audio = resample(audio, sr, CREPE_SR)
+    
+    frames = crepe_frames(audio, step_size)
+    if not vad:
+        activation = crepe_activation(frames, model_capacity)
+        return pitch_from_activation(activation, step_size, viterbi=viterbi, confidence_threshold=0.0)
+    
+    voiced = voice_activity(audio, CREPE_SR, int(CREPE_SR * step_size / 1000), CREPE_FRAME_LENGTH)
+    activation = crepe_activation(frames[voiced], model_capacity)
+    return pitch_from_activation(activation, step_size, viterbi=viterbi, confidence_threshold=0.0, voiced=voiced)
+
+
+def pyin_pitch(
+    audio: np.ndarray,
+    sr: int = 16000,
+    hop_length: int = 160,
+    fmin: float = PITCH_FMIN,
+    fmax: float = PITCH_FMAX,
+    vad: bool = False
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """librosa's probabilistic YIN; confidence is the voicing probability of each frame"""
+    import librosa
+    
+    frame_length = int(sr * YIN_FRAME_SECONDS)
+    
+    def track(segment, center):
+        f0, voiced, voiced_probability = librosa.pyin(
+            segment,
+            fmin=fmin,
+            fmax=fmax,
+            sr=sr,
+            frame_length=frame_length,
+            hop_length=hop_length,
+            center=center
+        )
+        return np.where(voiced, np.nan_to_num(f0), 0.0), voiced_probability
+    
+    audio = np.asarray(audio, dtype=np.float32)
+    if not vad:
+        frequency, confidence = track(audio, center=True)
+    else:
+        # Each voiced span is tracked (and its HMM decoded) on its own
+        voiced = voice_activity(audio, sr, hop_length, frame_length)
+        padded = np.pad(audio, frame_length // 2)
+        frequency = np.zeros(len(voiced))
+        confidence = np.zeros(len(voiced))
+        for start, stop in zip(*voiced_spans(voiced)):
+            segment = padded[start * hop_length:(stop - 1) * hop_length + frame_length]
+            frequency[start:stop], confidence[start:stop] = track(segment, center=False)
+    
+    time = np.arange(len(frequency)) * hop_length / sr
+    return time, frequency, confidence
+
+
+def yin_pitch(
+    audio: np.ndarray,
+    sr: int = 16000,
+    hop_length: int = 160,
+    fmin: float = PITCH_FMIN,
+    fmax: float = PITCH_FMAX,
+    threshold: float = YIN_THRESHOLD,
+    center: bool = True,
+    vad: bool = False
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    YIN pitch tracking in NumPy (de Cheveigné & Kawahara, 2002)
+    
+    Frames are centred like CREPE's, so all backends produce the same time
+    grid (`center=False` as in crepe_frames). With `vad`, only the frames
+    voice_activity keeps on that grid are analysed. The difference
+    function is computed for a block of frames at a time with FFT
+    autocorrelation. Confidence is one minus the normalized difference at
+    the chosen lag: near 1 for clean periodic frames, near 0 for noise and
+    silence.
+    """
+    frame_length = int(sr * YIN_FRAME_SECONDS)
+    tau_min = max(2, int(sr / fmax))
+    tau_max = min(int(np.ceil(sr / fmin)), frame_length // 2)
+    # Integration window: the lags up to tau_max still fit inside the frame
+    window = frame_length - tau_max
+    n_fft = 1 << int(np.ceil(np.log2(frame_length + window)))
+    lags = np.arange(1, tau_max + 1)
+    
+    audio = np.asarray(audio, dtype=np.float32)
+    active = voice_activity(audio, sr, hop_length, frame_length, center) if vad else None
+    if center:
+        audio = np.pad(audio, frame_length // 2)
+    frames = sliding_window_view(audio, frame_length)[::hop_length]
+    frequency = np.zeros(len(frames))
+    confidence = np.zeros(len(frames))
+    index = np.flatnonzero(active) if vad else np.arange(len(frames))
+    
+    for start in range(0, len(index), YIN_CHUNK_FRAMES):
+        selected = index[start:start + YIN_CHUNK_FRAMES]
+        block = frames[selected].astype(np.float64)
+        rows = np.arange(len(block))
+        
+        # acf[tau] = sum_j x[j] * x[j + tau] over the integration window
+        acf = np.fft.irfft(
+            np.fft.rfft(block, n_fft) * np.conj(np.fft.rfft(block[:, :window], n_fft)),
+            n_fft
+        )[:, :tau_max + 1]
+        # energy[tau] = sum_j x[j + tau] ** 2 over the integration window
+        power = np.concatenate((np.zeros((len(block), 1)), np.cumsum(block ** 2, axis=1)), axis=1)
+        energy = power[:, window:window + tau_max + 1] - power[:, :tau_max + 1]
+        
+        difference = np.maximum(energy[:, :1] + energy - 2 * acf, 0)
+        # Cumulative mean normalized difference: 1 at lag 0, dips at the period
+        cmnd = np.ones_like(difference)
+        cumulative = np.cumsum(difference[:, 1:], axis=1)
+        cmnd[:, 1:] = difference[:, 1:] * lags / np.maximum(cumulative, np.finfo(np.float64).tiny)
+        
+        # First local minimum under the threshold, else the global minimum
+        search = cmnd[:, tau_min:tau_max]
+        troughs = (search <= cmnd[:, tau_min - 1:tau_max - 1]) & (search < cmnd[:, tau_min + 1:tau_max + 1])
+        candidates = troughs & (search < threshold)
+        tau = np.where(candidates.any(axis=1), candidates.argmax(axis=1), search.argmin(axis=1)) + tau_min
+        
+        # Parabolic interpolation between neighbouring lags
+        left, centre, right = cmnd[rows, tau - 1], cmnd[rows, tau], cmnd[rows, tau + 1]
+        curvature = left - 2 * centre + right
+        shift = np.divide(left - right, 2 * curvature, out=np.zeros_like(curvature), where=curvature > 1e-12)
+        
+        silent = energy[:, 0] < window * YIN_SILENCE_RMS ** 2
+        frequency[selected] = np.where(silent, 0.0, sr / (tau + np.clip(shift, -1, 1)))
+        confidence[selected] = np.where(silent, 0.0, np.clip(1 - centre, 0, 1))
+    
+    time = np.arange(len(frames)) * hop_length / sr
+    return time, frequency, confidence
+
 
 def extract_pitch_from_audio(
-    audio_path: str,
+    audio: Union[str, np.ndarray],
     sr: int = 16000,
     hop_length: int = 160,
-    confidence_threshold: float = 0.3
+    confidence_threshold: float = 0.3,
+    backend: str = "crepe",
+    model_capacity: str = "tiny",
+    vad: bool = True
 ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    Extract pitch contour from audio using CREPE
+    Extract pitch contour from audio
+    
+    Args:
+        audio: Path to an audio file, or a mono waveform already at `sr`
+        backend: "crepe" (most accurate, loads TensorFlow), "pyin" (librosa)
+            or "yin" (NumPy only, fastest to start)
+        model_capacity: CREPE model size, 'tiny' for speed up to 'full' for accuracy
+        vad: Run the pitch tracker on voiced spans only (see voice_activity);
+            silence and pauses come out as 0 Hz with confidence 0
     
     Returns:
         time: Time stamps in seconds
-        frequency: Frequency in Hz
-        confidence: Confidence scores (0-1)
+        frequency: Pitch in Hz, 0 where unvoiced or below `confidence_threshold`
+        confidence: Per-frame confidence in [0, 1]
     """
+    if backend not in PITCH_BACKENDS:
+        raise ValueError(f"Unknown pitch backend '{backend}', expected one of {PITCH_BACKENDS}")
+    
     # Load audio
-    audio, sr = librosa.load(audio_path, sr=sr)
+    if isinstance(audio, str):
+        audio, sr = load_audio_file(audio, sr)
     
-    # Extract pitch using CREPE (tiny model for speed)
-    time, frequency, confidence, activation = crepe.predict(
-        audio,
-        sr,
-        model_capacity='tiny',  # Use 'tiny' for speed, 'full' for accuracy
-        viterbi=True,
-        step_size=hop_length / sr * 1000  # Convert to milliseconds
-    )
+    if backend == "crepe":
+        time, frequency, confidence = crepe_pitch(audio, sr, hop_length, model_capacity, vad=vad)
+    elif backend == "pyin":
+        time, frequency, confidence = pyin_pitch(audio, sr, hop_length, vad=vad)
+    else:
+        time, frequency, confidence = yin_pitch(audio, sr, hop_length, vad=vad)
     
     # Filter out low-confidence predictions
     frequency[confidence < confidence_threshold] = 0
@@ -50,134 +372,241 @@ def frequency_to_midi(frequency: float) -> int:
     return int(round(69 + 12 * np.log2(frequency / 440.0)))
 
 
+def frequencies_to_midi(frequency: np.ndarray) -> np.ndarray:
+    """Vectorized frequency_to_midi: nearest MIDI note per frame, 0 where unvoiced"""
+    frequency = np.asarray(frequency, dtype=np.float64)
+    midi = np.zeros(len(frequency), dtype=np.int64)
+    voiced = frequency > 0
+    # rint rounds half to even, like round() in frequency_to_midi
+    midi[voiced] = np.rint(69 + 12 * np.log2(frequency[voiced] / 440.0))
+    return midi
+
+
+SMOOTHING_METHODS = ("mean", "median", "cents")
+
+
 def smooth_pitch_contour(
     frequency: np.ndarray,
     confidence: np.ndarray,
-    window_size: int = 5
+    window_size: int = 5,
+    method: str = "mean",
+    min_confidence: float = 0.5
 ) -> np.ndarray:
-    """Smooth pitch contour to reduce jitter"""
+    """
+    Smooth pitch contour to reduce jitter
+    
+    Each voiced frame is replaced by a statistic of the confident, voiced
+    frames within `window_size // 2` frames of it; unvoiced frames and
+    frames with no such neighbours are left unchanged.
+    
+    Args:
+        method: "mean" (moving average in Hz), "median" (robust to octave
+            errors and glitches) or "cents" (moving average in log-frequency,
+            i.e. the geometric mean, so intervals are weighted evenly)
+    """
+    if method not in SMOOTHING_METHODS:
+        raise ValueError(f"Unknown smoothing method '{method}', expected one of {SMOOTHING_METHODS}")
+    
+    frequency = np.asarray(frequency)
     smoothed = np.copy(frequency)
+    if len(frequency) == 0:
+        return smoothed
+    
+    half = window_size // 2
+    width = 2 * half + 1
+    valid = (frequency > 0) & (np.asarray(confidence) > min_confidence)
+    # One row per frame: its window, padded at the edges with invalid frames
+    valid_windows = sliding_window_view(np.pad(valid, half), width)
+    counts = valid_windows.sum(axis=1)
+    update = (frequency > 0) & (counts > 0)
     
-    for i in range(len(frequency)):
-        if frequency[i] > 0:
-            start = max(0, i - window_size // 2)
-            end = min(len(frequency), i + window_size // 2 + 1)
-            
-            # Only average over confident, non-zero values
-            window = frequency[start:end]
-            conf_window = confidence[start:end]
-            valid = (window > 0) & (conf_window > 0.5)
-            
-            if np.any(valid):
-                smoothed[i] = np.mean(window[valid])
+    if method == "median":
+        # Invalid frames sort last as NaN; pick the middle of the first `counts`
+        values = np.pad(np.where(valid, frequency, np.nan), half, constant_values=np.nan)
+        windows = np.sort(sliding_window_view(values, width)[update], axis=1)
+        n = counts[update]
+        rows = np.arange(len(n))
+        smoothed[update] = (windows[rows, (n - 1) // 2] + windows[rows, n // 2]) / 2
+        return smoothed
+    
+    if method == "cents":
+        values = np.zeros_like(frequency)
+        values[valid] = np.log2(frequency[valid])
+    else:
+        values = np.where(valid, frequency, 0)
+    # Zeros in place of invalid frames leave each window's sum unchanged
+    sums = sliding_window_view(np.pad(values, half), width).sum(axis=1)
+    means = sums[update] / counts[update]
+    smoothed[update] = np.exp2(means) if method == "cents" else means
     
     return smoothed
 
 
-def segment_notes(
-    time: np.ndarray,
+def segment_runs(
     frequency: np.ndarray,
-    min_note_duration: float = 0.1,
     pitch_tolerance: int = 1
-) -> List[Tuple[float, float, int]]:
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    Segment continuous pitch into discrete notes
+    Frame ranges of the notes in a pitch contour, before duration filtering
+    
+    A note lasts while the pitch stays within `pitch_tolerance` semitones
+    of the pitch it started on, and ends at the first unvoiced frame.
     
     Returns:
-        List of (start_time, end_time, midi_note)
+        starts, stops: First frame of each note and the frame that ended it;
+            a note still sounding at the last frame stops at len(frequency)
+        pitches: MIDI pitch each note started on
     """
-    notes = []
+    n_frames = len(frequency)
+    midi = frequencies_to_midi(frequency)
+    voiced = np.asarray(frequency) > 0
     
-    if len(frequency) == 0:
-        return notes
+    # Run-length encode the frame pitches: within a run of equal pitch only
+    # the first frame can start or end a note, so the loop below is per run
+    changes = (np.diff(midi) != 0) | (np.diff(voiced) != 0)
+    run_starts = np.concatenate(([0], np.flatnonzero(changes) + 1)) if n_frames else np.zeros(0, dtype=np.intp)
     
+    starts, stops, pitches = [], [], []
     current_note = None
     note_start = None
-    
-    for i, (t, freq) in enumerate(zip(time, frequency)):
-        if freq > 0:
-            midi_note = frequency_to_midi(freq)
-            
+    for frame, midi_note, is_voiced in zip(
+        run_starts.tolist(), midi[run_starts].tolist(), voiced[run_starts].tolist()
+    ):
+        if is_voiced:
             if current_note is None:
-                # Start new note
                 current_note = midi_note
-                note_start = t
+                note_start = frame
             elif abs(midi_note - current_note) > pitch_tolerance:
-                # Note changed, save previous note
-                if note_start is not None and (t - note_start) >= min_note_duration:
-                    notes.append((note_start, t, current_note))
+                starts.append(note_start)
+                stops.append(frame)
+                pitches.append(current_note)
                 current_note = midi_note
-                note_start = t
-        else:
-            # Silence detected, end current note
-            if current_note is not None and note_start is not None:
-                if (t - note_start) >= min_note_duration:
-                    notes.append((note_start, t, current_note))
-                current_note = None
-                note_start = None
+                note_start = frame
+        elif current_note is not None:
+            starts.append(note_start)
+            stops.append(frame)
+            pitches.append(current_note)
+            current_note = None
+    if current_note is not None:
+        starts.append(note_start)
+        stops.append(n_frames)
+        pitches.append(current_note)
+    
+    return (
+        np.array(starts, dtype=np.intp),
+        np.array(stops, dtype=np.intp),
+        np.array(pitches, dtype=np.int64)
+    )
+
+
+def runs_to_notes(
+    time: np.ndarray,
+    starts: np.ndarray,
+    stops: np.ndarray,
+    pitches: np.ndarray,
+    min_note_duration: float = 0.1,
+    confidence: Optional[np.ndarray] = None
+) -> NoteArray:
+    """NoteArray from segment_runs output, dropping notes shorter than `min_note_duration`"""
+    time = np.asarray(time, dtype=np.float64)
+    if len(starts) == 0:
+        return NoteArray.empty()
+    
+    # A note ends at the frame that ended it; the last one at the last time stamp
+    start_times = time[starts]
+    end_times = time[np.minimum(stops, len(time) - 1)]
     
-    # Add final note if exists
-    if current_note is not None and note_start is not None:
-        if (time[-1] - note_start) >= min_note_duration:
-            notes.append((note_start, time[-1], current_note))
+    keep = (end_times - start_times) >= min_note_duration
+    if confidence is None:
+        note_confidence = np.nan
+    else:
+        # Mean confidence over each note's frames
+        totals = np.concatenate(([0.0], np.cumsum(confidence, dtype=np.float64)))
+        note_confidence = ((totals[stops] - totals[starts]) / (stops - starts))[keep]
     
-    return notes
+    return NoteArray(start_times[keep], end_times[keep], pitches[keep], confidence=note_confidence)
+
+
+def segment_notes(
+    time: np.ndarray,
+    frequency: np.ndarray,
+    min_note_duration: float = 0.1,
+    pitch_tolerance: int = 1,
+    confidence: Optional[np.ndarray] = None
+) -> NoteArray:
+    """
+    Segment continuous pitch into discrete notes
+    
+    A note lasts while the pitch stays within `pitch_tolerance` semitones
+    of the pitch it started on, and ends at the first unvoiced frame.
+    
+    Returns:
+        NoteArray of the notes, with confidence NaN when `confidence` is
+        not given
+    """
+    starts, stops, pitches = segment_runs(frequency, pitch_tolerance)
+    return runs_to_notes(time, starts, stops, pitches, min_note_duration, confidence)
 
 
 def create_midi_from_notes(
-    notes: List[Tuple[float, float, int]],
+    notes: Union[NoteArray, List[Tuple[float, float, int]]],
     tempo: int = 120,
-    velocity: int = 80
+    velocity: Optional[int] = None
 ) -> pretty_midi.PrettyMIDI:
     """
     Create MIDI file from note list
     
     Args:
-        notes: List of (start_time, end_time, midi_note)
+        notes: NoteArray from segment_notes, or list of (start_time, end_time, midi_note)
         tempo: BPM
-        velocity: Note velocity (0-127)
+        velocity: Note velocity (0-127) for every note; by default the notes' own
     """
-    midi = pretty_midi.PrettyMIDI(initial_tempo=tempo)
-    instrument = pretty_midi.Instrument(program=0)  # Acoustic Grand Piano
-    
-    for start, end, pitch in notes:
-        note = pretty_midi.Note(
-            velocity=velocity,
-            pitch=pitch,
-            start=start,
-            end=end
-        )
-        instrument.notes.append(note)
+    notes = as_note_array(notes)
+    if velocity is not None:
+        notes = NoteArray(notes.start, notes.end, notes.pitch, velocity, notes.confidence)
     
-    midi.instruments.append(instrument)
+    midi = pretty_midi.PrettyMIDI(initial_tempo=tempo)
+    midi.instruments.append(notes.to_instrument(program=0))  # Acoustic Grand Piano
     return midi
 
 
 def audio_to_midi(
-    audio_path: str,
+    audio: Union[str, np.ndarray],
     output_path: Optional[str] = None,
     confidence_threshold: float = 0.3,
     min_note_duration: float = 0.05,
-    smooth_window: int = 5
-) -> Tuple[pretty_midi.PrettyMIDI, List[dict]]:
+    smooth_window: int = 5,
+    smooth_method: str = "mean",
+    pitch_backend: str = "crepe",
+    model_capacity: str = "tiny",
+    vad: bool = True
+) -> Tuple[pretty_midi.PrettyMIDI, NoteArray]:
     """
     Complete pipeline: audio -> MIDI
     
+    Args:
+        audio: Path to an audio file, or a mono 16 kHz waveform
+        pitch_backend: One of PITCH_BACKENDS, see extract_pitch_from_audio
+        vad: Track pitch on voiced spans only; False tracks every frame
+    
     Returns:
         midi: PrettyMIDI object
-        notes_data: List of note dictionaries for frontend display
+        notes: NoteArray of the detected notes; `notes.to_json()` for frontend display
     """
     # Extract pitch
     time, frequency, confidence = extract_pitch_from_audio(
-        audio_path,
-        confidence_threshold=confidence_threshold
+        audio,
+        confidence_threshold=confidence_threshold,
+        backend=pitch_backend,
+        model_capacity=model_capacity,
+        vad=vad
     )
     
     # Smooth pitch contour
-    frequency = smooth_pitch_contour(frequency, confidence, window_size=smooth_window)
+    frequency = smooth_pitch_contour(frequency, confidence, window_size=smooth_window, method=smooth_method)
     
     # Segment into notes
-    notes = segment_notes(time, frequency, min_note_duration=min_note_duration)
+    notes = segment_notes(time, frequency, min_note_duration=min_note_duration, confidence=confidence)
     
     # Create MIDI
     midi = create_midi_from_notes(notes)
@@ -186,19 +615,7 @@ def audio_to_midi(
     if output_path:
         midi.write(output_path)
     
-    # Format notes for frontend
-    notes_data = [
-        {
-            "start": float(start),
-            "end": float(end),
-            "pitch": int(pitch),
-            "note_name": pretty_midi.note_number_to_name(pitch),
-            "duration": float(end - start)
-        }
-        for start, end, pitch in notes
-    ]
-    
-    return midi, notes_data
+    return midi, notes
 
 
 def midi_to_bytes(midi: pretty_midi.PrettyMIDI) -> bytes:
@@ -215,6 +632,7 @@ if __name__ == "__main__":
     
     if len(sys.argv) < 2:
         print("Usage: python humming_to_midi.py <audio_file>")
+        print("       python humming_batch.py <directory|manifest> --output <dir>  (many files)")
         sys.exit(1)
     
     audio_file = sys.argv[1]
@@ -224,7 +642,7 @@ if __name__ == "__main__":
     midi, notes = audio_to_midi(audio_file, output_file)
     
     print(f"\nExtracted {len(notes)} notes:")
-    for note in notes[:10]:  # Show first 10
+    for note in notes[:10].to_json():  # Show first 10
         print(f"  {note['note_name']}: {note['start']:.2f}s - {note['end']:.2f}s")
     
     print(f"\nMIDI saved to {output_file}")
@@ -0,0 +1,165 @@
+"""
+Note Arrays
+Column-oriented container for MIDI notes, shared by the humming pipeline,
+the accompaniment generator and the server, with bulk conversion to and
+from pretty_midi instruments and the JSON the frontend displays.
+"""
+
+import numpy as np
+import pretty_midi
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
+
+DEFAULT_VELOCITY = 80
+
+# Note names for every MIDI pitch, so JSON conversion is a table lookup
+NOTE_NAMES = [pretty_midi.note_number_to_name(pitch) for pitch in range(128)]
+
+
+class NoteArray:
+    """
+    Notes as parallel NumPy columns.
+
+    `start` and `end` are in seconds (float64), `pitch` and `velocity` are
+    MIDI numbers (int16) and `confidence` is the pitch tracker's mean
+    confidence over the note (float32, NaN when unknown). Indexing with a
+    column name returns that column; an int, slice or mask returns a new
+    NoteArray. Iterating yields `(start, end, pitch)` tuples.
+    """
+
+    __slots__ = ("start", "end", "pitch", "velocity", "confidence")
+    COLUMNS = __slots__
+
+    def __init__(
+        self,
+        start: Sequence[float] = (),
+        end: Sequence[float] = (),
+        pitch: Sequence[int] = (),
+        velocity: Union[int, Sequence[int]] = DEFAULT_VELOCITY,
+        confidence: Union[float, Sequence[float]] = np.nan
+    ):
+        self.start = np.asarray(start, dtype=np.float64).reshape(-1)
+        self.end = np.asarray(end, dtype=np.float64).reshape(-1)
+        self.pitch = np.asarray(pitch, dtype=np.int16).reshape(-1)
+        n = len(self.start)
+        # Scalars broadcast to every note
+        self.velocity = np.array(np.broadcast_to(np.asarray(velocity, dtype=np.int16), (n,)))
+        self.confidence = np.array(np.broadcast_to(np.asarray(confidence, dtype=np.float32), (n,)))
+        if len(self.end) != n or len(self.pitch) != n:
+            raise ValueError(
+                f"NoteArray columns differ in length: start {n}, end {len(self.end)}, pitch {len(self.pitch)}"
+            )
+
+    @classmethod
+    def empty(cls) -> "NoteArray":
+        return cls()
+
+    @classmethod
+    def from_tuples(cls, notes: Iterable[Tuple[float, float, int]], velocity: int = DEFAULT_VELOCITY) -> "NoteArray":
+        """From `(start, end, pitch)` tuples"""
+        notes = list(notes)
+        if not notes:
+            return cls()
+        start, end, pitch = zip(*notes)
+        return cls(start, end, pitch, velocity)
+
+    @classmethod
+    def from_instrument(cls, instrument: pretty_midi.Instrument) -> "NoteArray":
+        """All notes of a pretty_midi instrument, in its order"""
+        notes = instrument.notes
+        records = np.fromiter(
+            ((note.start, note.end, note.pitch, note.velocity) for note in notes),
+            dtype=[("start", np.float64), ("end", np.float64), ("pitch", np.int16), ("velocity", np.int16)],
+            count=len(notes)
+        )
+        return cls(records["start"], records["end"], records["pitch"], records["velocity"])
+
+    @classmethod
+    def from_json(cls, items: Sequence[dict]) -> "NoteArray":
+        """From note dictionaries as produced by to_json; velocity and confidence are optional"""
+        if not items:
+            return cls()
+        confidence = [item.get("confidence") for item in items]
+        return cls(
+            [item["start"] for item in items],
+            [item["end"] for item in items],
+            [item["pitch"] for item in items],
+            [item.get("velocity", DEFAULT_VELOCITY) for item in items],
+            [np.nan if c is None else c for c in confidence]
+        )
+
+    @classmethod
+    def concatenate(cls, arrays: Sequence["NoteArray"]) -> "NoteArray":
+        if not arrays:
+            return cls()
+        return cls(*(np.concatenate([getattr(a, column) for a in arrays]) for column in cls.COLUMNS))
+
+    @property
+    def duration(self) -> np.ndarray:
+        return self.end - self.start
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __getitem__(self, key) -> Union[np.ndarray, "NoteArray"]:
+        if isinstance(key, str):
+            if key not in self.COLUMNS:
+                raise KeyError(key)
+            return getattr(self, key)
+        if isinstance(key, (int, np.integer)):
+            if not -len(self) <= key < len(self):
+                raise IndexError(f"Note index {key} out of range for {len(self)} notes")
+            key = [key]
+        return NoteArray(*(getattr(self, column)[key] for column in self.COLUMNS))
+
+    def __iter__(self) -> Iterator[Tuple[float, float, int]]:
+        return iter(self.to_tuples())
+
+    def __repr__(self) -> str:
+        preview = ", ".join(f"({s:.2f}-{e:.2f} {NOTE_NAMES[p]})" for s, e, p in self.to_tuples()[:4])
+        more = ", ..." if len(self) > 4 else ""
+        return f"NoteArray({len(self)} notes: [{preview}{more}])"
+
+    def sorted(self) -> "NoteArray":
+        """Notes ordered by start time (stable)"""
+        return self[np.argsort(self.start, kind="stable")]
+
+    def to_tuples(self) -> List[Tuple[float, float, int]]:
+        return list(zip(self.start.tolist(), self.end.tolist(), self.pitch.tolist()))
+
+    def to_instrument(self, program: int = 0, name: str = "", is_drum: bool = False) -> pretty_midi.Instrument:
+        """A pretty_midi instrument holding these notes"""
+        instrument = pretty_midi.Instrument(program=program, is_drum=is_drum, name=name)
+        instrument.notes = list(map(
+            pretty_midi.Note,
+            self.velocity.tolist(),
+            self.pitch.tolist(),
+            self.start.tolist(),
+            self.end.tolist()
+        ))
+        return instrument
+
+    def to_json(self) -> List[dict]:
+        """Note dictionaries for the frontend"""
+        start = self.start.tolist()
+        end = self.end.tolist()
+        duration = self.duration.tolist()
+        # NaN (unknown) confidence becomes None
+        confidence = [None if c != c else round(c, 3) for c in self.confidence.tolist()]
+        return [
+            {
+                "start": s,
+                "end": e,
+                "pitch": p,
+                "note_name": NOTE_NAMES[p],
+                "duration": d,
+                "confidence": c
+            }
+            for s, e, p, d, c in zip(start, end, self.pitch.tolist(), duration, confidence)
+        ]
+
+
+def as_note_array(notes: Union[NoteArray, Iterable[Tuple[float, float, int]]]) -> NoteArray:
+    """Accept a NoteArray or a legacy list of `(start, end, pitch)` tuples"""
+    if isinstance(notes, NoteArray):
+        return notes
+    return NoteArray.from_tuples(notes)
@@ -0,0 +1,20 @@
+"""
+Process Info
+Start time of the running process, shared by the servers' cold-start
+reporting.
+"""
+
+import os
+
+
+def process_start_time(fallback: float) -> float:
+    """Wall-clock time this process was started (Linux), else `fallback`"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 is the start time in clock ticks after boot; skip past "(comm)"
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return fallback
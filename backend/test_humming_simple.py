@@ -25,7 +25,7 @@ if os.path.exists(test_file):
         midi, notes = audio_to_midi(test_file, "test_output.mid")
         print(f"✓ Extracted {len(notes)} notes")
         if notes:
-            print(f"  First note: {notes[0]}")
+            print(f"  First note: {notes.to_json()[0]}")
         if midi:
             print(f"✓ MIDI file created: test_output.mid")
         else:
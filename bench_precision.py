@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+MusicGen CPU precision benchmark
+Compares fp32, int8 dynamic quantization and bf16 autocast: latency per
+generated second of audio, and spectral distance of each mode's output
+against fp32 for the same prompts and seeds.
+
+Usage:
+    python bench_precision.py --model facebook/musicgen-small --duration 5
+    python bench_precision.py --greedy --output precision.json
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+from transformers import MusicgenForConditionalGeneration, AutoProcessor
+
+from musicgen_precision import PRECISIONS, apply_precision, precision_context
+
+PROMPTS = [
+    "lo-fi hip hop beat with mellow piano chords",
+    "upbeat rock track with distorted electric guitar",
+    "ambient synth pad with slow evolving textures"
+]
+
+
+def log_spectrogram(audio: np.ndarray, n_fft: int = 2048, hop_length: int = 512) -> np.ndarray:
+    """Log-magnitude STFT in dB, shape (frames, bins)"""
+    if len(audio) < n_fft:
+        audio = np.pad(audio, (0, n_fft - len(audio)))
+    frames = np.lib.stride_tricks.sliding_window_view(audio, n_fft)[::hop_length]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(n_fft), axis=1))
+    return 20 * np.log10(spectrum + 1e-6)
+
+
+def log_spectral_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """Frame-wise RMS log-spectral distance in dB (meaningful when token paths match)"""
+    n = min(len(a), len(b))
+    sa, sb = log_spectrogram(a[:n]), log_spectrogram(b[:n])
+    return float(np.mean(np.sqrt(np.mean((sa - sb) ** 2, axis=1))))
+
+
+def average_spectrum_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """Mean absolute dB difference of the long-term average spectra"""
+    return float(np.mean(np.abs(log_spectrogram(a).mean(axis=0) - log_spectrogram(b).mean(axis=0))))
+
+
+def run_precision(precision: str, args, processor) -> dict:
+    model = MusicgenForConditionalGeneration.from_pretrained(args.model)
+    model.eval()
+    apply_precision(model, precision)
+    sampling_rate = model.config.audio_encoder.sampling_rate
+    max_new_tokens = int(args.duration * 50)
+    generate_kwargs = {"do_sample": False} if args.greedy else {}
+
+    # Warmup so one-off allocation and kernel selection costs are not timed
+    warmup_inputs = processor(text=[PROMPTS[0]], padding=True, return_tensors="pt")
+    with torch.no_grad(), precision_context(precision):
+        model.generate(**warmup_inputs, max_new_tokens=10, **generate_kwargs)
+
+    outputs = []
+    timings = []
+    for run in range(args.runs):
+        for i, prompt in enumerate(PROMPTS):
+            inputs = processor(text=[prompt], padding=True, return_tensors="pt")
+            torch.manual_seed(args.seed + i)
+            start = time.perf_counter()
+            with torch.no_grad(), precision_context(precision):
+                audio_values = model.generate(**inputs, max_new_tokens=max_new_tokens, **generate_kwargs)
+            elapsed = time.perf_counter() - start
+
+            audio = audio_values[0, 0].float().cpu().numpy()
+            timings.append(elapsed / (len(audio) / sampling_rate))
+            if run == 0:
+                outputs.append(audio)
+
+    return {
+        "latency_per_generated_second": float(np.median(timings)),
+        "latency_per_generated_second_min": float(np.min(timings)),
+        "outputs": outputs
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="facebook/musicgen-small")
+    parser.add_argument("--precisions", nargs="+", default=list(PRECISIONS), choices=PRECISIONS)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of audio per generation")
+    parser.add_argument("--runs", type=int, default=2, help="Timed passes over the prompt set")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--greedy", action="store_true", help="Greedy decoding, so token paths are comparable")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    precisions = list(dict.fromkeys(["fp32"] + args.precisions))
+    processor = AutoProcessor.from_pretrained(args.model)
+
+    results = {}
+    for precision in precisions:
+        print(f"Benchmarking {precision}...")
+        results[precision] = run_precision(precision, args, processor)
+
+    reference = results["fp32"]["outputs"]
+    report = {
+        "model": args.model,
+        "duration": args.duration,
+        "greedy": args.greedy,
+        "threads": torch.get_num_threads(),
+        "precisions": {}
+    }
+    for precision in precisions:
+        result = results[precision]
+        outputs = result.pop("outputs")
+        result["speedup_vs_fp32"] = (
+            results["fp32"]["latency_per_generated_second"] / result["latency_per_generated_second"]
+        )
+        result["log_spectral_distance_db"] = float(np.mean(
+            [log_spectral_distance(a, b) for a, b in zip(reference, outputs)]
+        ))
+        result["average_spectrum_distance_db"] = float(np.mean(
+            [average_spectrum_distance(a, b) for a, b in zip(reference, outputs)]
+        ))
+        report["precisions"][precision] = result
+
+    print("=" * 72)
+    print(f"{'precision':<10}{'s / gen s':>12}{'speedup':>10}{'LSD dB':>12}{'avg spec dB':>14}")
+    for precision, r in report["precisions"].items():
+        print(
+            f"{precision:<10}{r['latency_per_generated_second']:>12.2f}{r['speedup_vs_fp32']:>10.2f}"
+            f"{r['log_spectral_distance_db']:>12.2f}{r['average_spectrum_distance_db']:>14.2f}"
+        )
+    print("=" * 72)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+MusicGen server benchmark (offline)
+Runs the real FastAPI handlers in-process against a tiny randomly
+initialized MusicGen built from config, so no weights are downloaded.
+Measures end-to-end handler latency per endpoint and duration, batched
+throughput across concurrency levels, and peak RSS, and writes JSON that
+can be compared between commits as a performance regression gate.
+
+Usage:
+    python bench_server.py --output bench.json
+    python bench_server.py --compare bench_baseline.json --tolerance 0.15
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+TINY_VOCAB = "jazz piano rock drums lofi beat ambient synth guitar bass upbeat mellow slow fast chords".split()
+
+
+def build_tiny_musicgen(hidden_size: int = 32, layers: int = 2, num_codebooks: int = 4, seed: int = 0):
+    """Random-weight MusicGen and processor with the real architecture, at toy size"""
+    import torch
+    import transformers
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import (
+        EncodecConfig,
+        EncodecFeatureExtractor,
+        MusicgenConfig,
+        MusicgenDecoderConfig,
+        MusicgenForConditionalGeneration,
+        MusicgenProcessor,
+        T5Config,
+        T5TokenizerFast
+    )
+
+    transformers.logging.set_verbosity_error()  # config dumps on every build
+    torch.manual_seed(seed)
+    codebook_size = 64
+    text_config = T5Config(
+        vocab_size=len(TINY_VOCAB) + 3,
+        d_model=hidden_size,
+        d_kv=hidden_size // 2,
+        d_ff=hidden_size * 2,
+        num_layers=layers,
+        num_heads=2
+    )
+    audio_config = EncodecConfig(
+        sampling_rate=32000,
+        audio_channels=1,
+        num_filters=4,
+        hidden_size=hidden_size,
+        upsampling_ratios=[8, 5, 4, 4],  # 640 samples per frame, 50 Hz like the real model
+        codebook_size=codebook_size,
+        codebook_dim=hidden_size,
+        num_lstm_layers=1,
+        target_bandwidths=[2.0],
+        use_causal_conv=False,
+        norm_type="weight_norm",
+        chunk_length_s=None,
+        overlap=None
+    )
+    decoder_config = MusicgenDecoderConfig(
+        vocab_size=codebook_size,
+        hidden_size=hidden_size,
+        num_hidden_layers=layers,
+        num_attention_heads=2,
+        ffn_dim=hidden_size * 2,
+        num_codebooks=num_codebooks,
+        audio_channels=1,
+        pad_token_id=codebook_size,
+        bos_token_id=codebook_size
+    )
+    config = MusicgenConfig(
+        text_encoder=text_config.to_dict(),
+        audio_encoder=audio_config.to_dict(),
+        decoder=decoder_config.to_dict()
+    )
+    model = MusicgenForConditionalGeneration(config).eval()
+    model.generation_config.decoder_start_token_id = codebook_size
+    model.generation_config.pad_token_id = codebook_size
+    model.generation_config.do_sample = True
+    model.generation_config.guidance_scale = 3.0
+    model.generation_config.max_length = 1500
+
+    # Offline word-level tokenizer standing in for the T5 sentencepiece model
+    vocab = {"<pad>": 0, "</s>": 1, "<unk>": 2}
+    vocab.update({word: i + 3 for i, word in enumerate(TINY_VOCAB)})
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    processor = MusicgenProcessor(
+        EncodecFeatureExtractor(feature_size=1, sampling_rate=32000),
+        T5TokenizerFast(tokenizer_object=tokenizer, pad_token="<pad>", eos_token="</s>", unk_token="<unk>", extra_ids=0)
+    )
+    return model, processor
+
+
+def reset_peak_rss():
+    """Reset the kernel's peak-RSS counter where supported (Linux)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KB on Linux and bytes on macOS, and never resets
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+def melody_upload(seconds: float = 5.0, sample_rate: int = 44100) -> bytes:
+    """Synthetic hummed-melody WAV (44.1 kHz, so decode and resample are exercised)"""
+    import scipy.io.wavfile
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    freq = 220.0 * 2 ** (np.floor(t * 2) % 5 / 12)
+    audio = (0.3 * np.sin(2 * np.pi * freq * t) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    scipy.io.wavfile.write(buffer, sample_rate, audio)
+    return buffer.getvalue()
+
+
+def summarize(samples) -> dict:
+    samples = sorted(samples)
+    return {
+        "median_ms": statistics.median(samples) * 1000,
+        "p90_ms": samples[min(len(samples) - 1, int(round(0.9 * (len(samples) - 1))))] * 1000,
+        "min_ms": samples[0] * 1000
+    }
+
+
+def timed(fn, runs: int):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_latency(client, args, upload: bytes) -> dict:
+    results = {}
+    for duration in args.durations:
+        body = {"prompt": "lofi beat with mellow piano", "duration": duration}
+
+        def generate_json():
+            response = client.post("/generate", json=body)
+            assert response.json()["success"], response.text
+
+        def generate_wav():
+            response = client.post("/generate", json={**body, "response_format": "wav"})
+            assert response.status_code == 200, response.text
+
+        def generate_melody():
+            response = client.post(
+                "/generate-from-melody",
+                files={"audio_file": ("melody.wav", upload)},
+                data={"prompt": "jazz piano", "duration": str(duration)}
+            )
+            assert response.json()["success"], response.text
+
+        first_byte = []
+
+        def generate_stream():
+            start = time.perf_counter()
+            with client.stream("POST", "/generate-stream", json=body) as response:
+                chunks = response.iter_bytes()
+                next(chunks)
+                first_byte.append(time.perf_counter() - start)
+                for _ in chunks:
+                    pass
+
+        results[f"{duration:g}s"] = {
+            "generate_json": summarize(timed(generate_json, args.runs)),
+            "generate_wav": summarize(timed(generate_wav, args.runs)),
+            "generate_melody": summarize(timed(generate_melody, args.runs)),
+            "generate_stream": summarize(timed(generate_stream, args.runs)),
+            "generate_stream_first_byte": summarize(first_byte)
+        }
+        print(f"  latency {duration:g}s: json {results[f'{duration:g}s']['generate_json']['median_ms']:.0f} ms")
+    return results
+
+
+def bench_throughput(client, args) -> dict:
+    results = {}
+    for batch_size in args.batch_sizes:
+        def request(i):
+            response = client.post(
+                "/generate",
+                json={"prompt": f"{TINY_VOCAB[i % len(TINY_VOCAB)]} beat", "duration": args.throughput_duration}
+            )
+            assert response.json()["success"], response.text
+
+        with ThreadPoolExecutor(max_workers=batch_size) as pool:
+            start = time.perf_counter()
+            for _ in range(args.runs):
+                list(pool.map(request, range(batch_size)))
+            elapsed = time.perf_counter() - start
+
+        requests = batch_size * args.runs
+        results[f"concurrency_{batch_size}"] = {
+            "requests_per_second": requests / elapsed,
+            "audio_seconds_per_second": requests * args.throughput_duration / elapsed
+        }
+        print(f"  throughput x{batch_size}: {requests / elapsed:.2f} req/s")
+    return results
+
+
+def run_benchmarks(args) -> dict:
+    # Configure the server before importing it: no disk cache, batching sized for the sweep
+    os.environ["MUSICGEN_CACHE_MAX_MB"] = "0"
+    os.environ["MUSICGEN_PRECISION"] = args.precision
+    os.environ["MUSICGEN_BATCH_MAX_SIZE"] = str(max(args.batch_sizes))
+    os.environ["MUSICGEN_MAX_PENDING"] = str(max(64, 2 * max(args.batch_sizes)))
+    os.environ["MUSICGEN_REPLICAS"] = str(args.replicas)
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    import musicgen_server
+    from fastapi.testclient import TestClient
+
+    def load_tiny(repo_id):
+        model, processor = build_tiny_musicgen(args.hidden_size, args.layers)
+        musicgen_server.apply_precision(model, musicgen_server.PRECISION)
+        return model, processor
+
+    musicgen_server.model_registry.loader = load_tiny
+    upload = melody_upload()
+
+    report = {
+        "config": {
+            "hidden_size": args.hidden_size,
+            "layers": args.layers,
+            "precision": args.precision,
+            "replicas": args.replicas,
+            "runs": args.runs,
+            "durations": args.durations,
+            "batch_sizes": args.batch_sizes,
+            "throughput_duration": args.throughput_duration
+        },
+        "peak_rss_mb": {}
+    }
+
+    with TestClient(musicgen_server.app) as client:
+        # Models load in the background at startup; wait for ready
+        startup = client.get("/health").json()["startup"]
+        while startup["phase"] not in ("ready", "failed"):
+            time.sleep(0.05)
+            startup = client.get("/health").json()["startup"]
+        report["cold_start"] = {"ready_seconds": startup["ready_seconds"]}
+
+        # Warmup: load both models and take one-off costs outside the timings
+        client.post("/generate", json={"prompt": "jazz", "duration": 0.2})
+        client.post("/generate-from-melody", files={"audio_file": ("melody.wav", upload)}, data={"duration": "0.2", "prompt": "jazz"})
+        report["peak_rss_mb"]["warmup"] = peak_rss_mb()
+
+        print("Benchmarking handler latency...")
+        reset_peak_rss()
+        report["latency"] = bench_latency(client, args, upload)
+        report["peak_rss_mb"]["latency"] = peak_rss_mb()
+
+        print("Benchmarking batched throughput...")
+        reset_peak_rss()
+        report["throughput"] = bench_throughput(client, args)
+        report["peak_rss_mb"]["throughput"] = peak_rss_mb()
+
+    return report
+
+
+def flatten(report: dict, prefix: str = "") -> dict:
+    values = {}
+    for key, value in report.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            values.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    """Metrics that got worse by more than `tolerance` (relative)"""
+    base, cur = flatten(baseline), flatten(current)
+    regressions = []
+    print("=" * 88)
+    print(f"{'metric':<60}{'baseline':>10}{'current':>10}{'change':>8}")
+    for path in sorted(base.keys() & cur.keys()):
+        if path.startswith("config."):
+            continue
+        higher_is_better = path.endswith("_per_second")
+        old, new = base[path], cur[path]
+        if old == 0:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        flag = " !" if worse > tolerance else ""
+        print(f"{path:<60}{old:>10.1f}{new:>10.1f}{change:>+8.0%}{flag}")
+        if worse > tolerance:
+            regressions.append(path)
+    print("=" * 88)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", type=float, nargs="+", default=[1.0, 4.0], help="Seconds of audio per request")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8], help="Concurrent requests for throughput")
+    parser.add_argument("--throughput-duration", type=float, default=1.0)
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions per measurement")
+    parser.add_argument("--hidden-size", type=int, default=32, help="Tiny model width")
+    parser.add_argument("--layers", type=int, default=2, help="Tiny model depth")
+    parser.add_argument("--precision", default="fp32", choices=["fp32", "int8", "bf16"])
+    parser.add_argument("--replicas", type=int, default=0, help="MUSICGEN_REPLICAS for the run")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON; exit non-zero if any metric regresses")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression for --compare")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
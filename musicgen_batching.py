@@ -0,0 +1,112 @@
+"""
+Dynamic micro-batching for MusicGen
+Collects generation requests that arrive within a short window and runs
+them through the model as one padded batch.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationBatcher:
+    """
+    Groups concurrent requests by key and runs each group as a single batch.
+
+    Requests with the same key (e.g. `max_new_tokens`) that arrive within
+    `max_wait_ms` of the first one are flushed together, or earlier once
+    `max_batch_size` requests are waiting. `run_batch(key, items)` must return
+    one result per item, in order. A cancelled request leaves its group if
+    the batch has not started; a running batch is cancelled only once every
+    request in it has been cancelled.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[Hashable, List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 50.0
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._running = set()
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        """Queue one item and wait for its share of the batch result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        group = self._pending.setdefault(key, [])
+        group.append((item, future))
+
+        if len(group) >= self.max_batch_size:
+            self._flush(key)
+        elif len(group) == 1:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+
+        try:
+            return await future
+        except asyncio.CancelledError:
+            self._withdraw(key, future)
+            raise
+
+    def pending_count(self) -> int:
+        """Number of requests waiting for their batch to start"""
+        return sum(len(group) for group in self._pending.values())
+
+    def _withdraw(self, key: Hashable, future: asyncio.Future):
+        group = self._pending.get(key)
+        if not group:
+            return
+        group[:] = [(item, f) for item, f in group if f is not future]
+        if not group:
+            del self._pending[key]
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+
+    def _flush(self, key: Hashable):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        group = self._pending.pop(key, None)
+        if not group:
+            return
+
+        task = asyncio.ensure_future(self._run(key, group))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, key: Hashable, group: List[Tuple[Any, asyncio.Future]]):
+        items = [item for item, _ in group]
+        logger.info(f"Running batch of {len(items)} (key={key})")
+
+        task = asyncio.ensure_future(self.run_batch(key, items))
+
+        def on_request_done(_):
+            if all(future.cancelled() for _, future in group):
+                task.cancel()
+
+        for _, future in group:
+            future.add_done_callback(on_request_done)
+
+        try:
+            results = await task
+        except asyncio.CancelledError:
+            logger.info(f"Batch of {len(items)} cancelled: every request was withdrawn")
+            return
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(group, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,227 @@
+"""
+Generation Result Cache for MusicGen
+Disk-backed LRU cache of generated audio, keyed by a hash of everything
+that determines the output, with single-flight de-duplication of
+concurrent identical requests, plus a memory-bounded LRU for intermediate
+values such as melody conditioning features.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(**fields) -> str:
+    """Stable content hash of the fields that determine a generation"""
+    payload = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def value_nbytes(value) -> int:
+    """Approximate memory held by arrays and tensors inside a (nested) value"""
+    if isinstance(value, dict):
+        return sum(value_nbytes(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(value_nbytes(v) for v in value)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if hasattr(value, "element_size"):
+        return value.numel() * value.element_size()
+    return 0
+
+
+class MemoryCache:
+    """
+    Thread-safe in-memory LRU cache bounded by the total size of its values.
+
+    Values are shared between callers, so treat them as read-only. A value
+    larger than `max_bytes` on its own is not cached.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        size = value_nbytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "size_mb": round(self._bytes / 2**20, 1),
+                "max_size_mb": round(self.max_bytes / 2**20, 1)
+            }
+
+
+class ResultCache:
+    """
+    LRU cache of `(audio, sampling_rate)` results stored as .npz files.
+
+    The LRU order lives in memory and is rebuilt from file mtimes at start,
+    so the cache survives restarts. `get_or_generate()` makes concurrent
+    callers with the same key share one in-flight generation.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._index = OrderedDict()
+        self._bytes = 0
+        self._inflight = {}
+
+        files = sorted(self.directory.glob("*.npz"), key=lambda f: f.stat().st_mtime)
+        for f in files:
+            size = f.stat().st_size
+            self._index[f.stem] = size
+            self._bytes += size
+        self._evict()
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, int]]:
+        """Load a cached result and mark it most recently used"""
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                result = data["audio"], int(data["sampling_rate"])
+            os.utime(path)
+            return result
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+            self._drop(key)
+            return None
+
+    def put(self, key: str, audio: np.ndarray, sampling_rate: int):
+        """Store a result, evicting least recently used entries over the size limit"""
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, audio=audio, sampling_rate=sampling_rate)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._bytes -= self._index.pop(key, 0)
+            size = path.stat().st_size
+            self._index[key] = size
+            self._bytes += size
+        self._evict()
+
+    async def get_or_generate(
+        self,
+        key: str,
+        generate: Callable[[], Awaitable[Tuple[np.ndarray, int]]]
+    ) -> Tuple[np.ndarray, int]:
+        """Return the cached result for `key`, or generate it exactly once"""
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            # Unlike awaiting it, waiting does not cancel the owner's generation
+            # if this request goes away, and tells the two cases apart
+            await asyncio.wait([inflight])
+            if not inflight.cancelled():
+                return inflight.result()
+            # The request generating this result was aborted; take over
+            return await self.get_or_generate(key, generate)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await asyncio.to_thread(self.get, key)
+            if result is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                result = await generate()
+                await asyncio.to_thread(self.put, key, *result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark as retrieved so an unawaited failure is not logged twice
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "entries": len(self._index),
+                "size_mb": round(self._bytes / 2**20, 1),
+                "max_size_mb": round(self.max_bytes / 2**20, 1)
+            }
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.npz"
+
+    def _drop(self, key: str):
+        with self._lock:
+            self._bytes -= self._index.pop(key, 0)
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                if self._bytes <= self.max_bytes or not self._index:
+                    return
+                key, size = self._index.popitem(last=False)
+                self._bytes -= size
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
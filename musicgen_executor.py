@@ -0,0 +1,172 @@
+"""
+Inference Executor for MusicGen
+Runs blocking model work on dedicated worker threads so the asyncio event
+loop stays free to answer other requests, with bounded admission.
+"""
+
+import asyncio
+import functools
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the inference queue is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Inference queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RandomStateLock:
+    """
+    Keeps seeded generations repeatable on concurrent worker threads.
+
+    Sampling draws from torch's process-wide RNG, so a seeded generation
+    holds the lock `exclusive()`ly from seeding to its last step, while
+    unseeded ones only need it `shared()` among themselves. Waiting
+    exclusive holders block new shared ones so they are not starved.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+        self._waiting_exclusive = 0
+
+    @contextmanager
+    def shared(self):
+        with self._condition:
+            self._condition.wait_for(lambda: not self._exclusive and not self._waiting_exclusive)
+            self._shared += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._shared -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._condition:
+            self._waiting_exclusive += 1
+            try:
+                self._condition.wait_for(lambda: not self._exclusive and not self._shared)
+            finally:
+                self._waiting_exclusive -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._exclusive = False
+                self._condition.notify_all()
+
+
+class InferenceExecutor:
+    """
+    Bounded pool of inference worker threads.
+
+    `admission()` (or `reserve()`/`release()` for responses that outlive the
+    handler) guards a whole request, which may wait in a batcher before
+    reaching a worker, and rejects it once `max_pending` requests are already
+    queued or running. `run()` executes a blocking callable on a worker and
+    can be awaited from a handler. With `cancellable=True` the callable gets
+    a `cancel_event` keyword argument that is set if the awaiting task is
+    cancelled, so it can stop early.
+    """
+
+    def __init__(self, max_workers: int = 1, max_pending: int = 16):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="musicgen-infer"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._avg_seconds = None
+
+    def reserve(self):
+        """Take a queue slot for one request, or raise ExecutorSaturated"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ExecutorSaturated(self.retry_after())
+            self._pending += 1
+
+    def release(self):
+        """Give back a slot taken with reserve()"""
+        with self._lock:
+            self._pending -= 1
+
+    @contextmanager
+    def admission(self):
+        """Hold a queue slot for the duration of one request"""
+        self.reserve()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def run(self, fn: Callable, *args, cancellable: bool = False, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` on a worker thread"""
+        cancel_event = None
+        if cancellable:
+            cancel_event = kwargs["cancel_event"] = threading.Event()
+        
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._pool,
+                functools.partial(self._timed, fn, *args, **kwargs)
+            )
+        except asyncio.CancelledError:
+            if cancel_event is not None:
+                cancel_event.set()
+            raise
+
+    async def run_on_all(self, fn: Callable, *args, **kwargs) -> list:
+        """Run `fn` once per process that holds models (here: just this one)"""
+        return [await self.run(fn, *args, **kwargs)]
+
+    def retry_after(self) -> int:
+        """Rough number of seconds until a queue slot frees up"""
+        if self._avg_seconds is None:
+            return 1
+        return max(1, math.ceil(self._avg_seconds * self._pending / self.max_workers))
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "running": self._running,
+            "avg_task_seconds": self._avg_seconds
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _timed(self, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self._running += 1
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._record_task(time.perf_counter() - start)
+
+    def _record_task(self, elapsed: float):
+        with self._lock:
+            # Exponential moving average of task time, used for Retry-After
+            if self._avg_seconds is None:
+                self._avg_seconds = elapsed
+            else:
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
@@ -0,0 +1,256 @@
+"""
+Asynchronous Generation Jobs for MusicGen
+Queues long generations as jobs that clients poll instead of holding an
+HTTP connection open, with shortest-job-first scheduling, progress
+reporting and cancellation.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from transformers import StoppingCriteria, StoppingCriteriaList
+
+from musicgen_executor import ExecutorSaturated
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class GenerationCancelled(Exception):
+    """Raised by a worker whose generation was stopped through its cancel event"""
+
+
+class GenerationMonitor(StoppingCriteria):
+    """
+    Stopping criterion that reports decoder steps and stops on cancellation.
+
+    `on_step(steps)` is called every `report_every` steps. Generation stops
+    at the next step once `cancel_event` is set.
+    """
+
+    def __init__(
+        self,
+        on_step: Optional[Callable[[int], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        report_every: int = 10
+    ):
+        self.on_step = on_step
+        self.cancel_event = cancel_event
+        self.report_every = report_every
+        self.steps = 0
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        self.steps += 1
+        if self.on_step is not None and self.steps % self.report_every == 0:
+            self.on_step(self.steps)
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+
+def monitor_kwargs(on_step=None, cancel_event=None) -> dict:
+    """generate() kwargs that attach a GenerationMonitor, or none if not needed"""
+    if on_step is None and cancel_event is None:
+        return {}
+    return {"stopping_criteria": StoppingCriteriaList([GenerationMonitor(on_step, cancel_event)])}
+
+
+class Job:
+    """One queued generation and its outcome"""
+
+    def __init__(
+        self,
+        kind: str,
+        run: Callable[["Job"], Awaitable[Any]],
+        cost: float,
+        params: dict,
+        total_steps: Optional[int] = None
+    ):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.run = run
+        self.cost = cost
+        self.params = params
+        self.status = QUEUED
+        self.steps = 0
+        self.total_steps = total_steps
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.task = None
+
+    def report_steps(self, steps: int):
+        """Progress callback, safe to call from worker threads"""
+        self.steps = steps
+
+    @property
+    def progress(self) -> float:
+        if self.status == SUCCEEDED:
+            return 1.0
+        if not self.total_steps:
+            return 0.0
+        return min(1.0, self.steps / self.total_steps)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": round(self.progress, 3),
+            "params": self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error
+        }
+
+
+class JobQueue:
+    """
+    Priority queue of generation jobs run by a fixed number of dispatchers.
+
+    Jobs are picked by `cost` (seconds of audio requested), lowest first, so
+    short previews are not stuck behind long renders. `aging` seconds of
+    cost are forgiven per second waited, so long jobs still start under a
+    steady stream of short ones. Finished jobs are kept for `finished_ttl`
+    seconds (at most `max_finished` of them) so clients can collect results.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        max_queued: int = 64,
+        max_finished: int = 256,
+        finished_ttl: float = 3600.0,
+        aging: float = 0.1
+    ):
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.finished_ttl = finished_ttl
+        self.aging = aging
+        self._jobs = {}
+        self._queued = []
+        self._wakeup = None
+        self._dispatchers = []
+
+    def start(self):
+        self._wakeup = asyncio.Condition()
+        self._dispatchers = [asyncio.ensure_future(self._dispatch()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for dispatcher in self._dispatchers:
+            dispatcher.cancel()
+        for job in list(self._jobs.values()):
+            if job.task is not None:
+                job.task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+
+    async def submit(
+        self,
+        kind: str,
+        run: Callable[[Job], Awaitable[Any]],
+        cost: float,
+        params: dict,
+        total_steps: Optional[int] = None
+    ) -> Job:
+        """Queue a job; `run(job)` is awaited when it is scheduled"""
+        self._prune()
+        if len(self._queued) >= self.max_queued:
+            raise ExecutorSaturated(max(1, int(self._queued_cost() / self.workers)))
+
+        job = Job(kind, run, cost, params, total_steps)
+        self._jobs[job.id] = job
+        self._queued.append(job)
+        async with self._wakeup:
+            self._wakeup.notify()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; finished jobs are left as they are"""
+        job = self._jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        if job.status == QUEUED:
+            self._queued.remove(job)
+            self._finish(job, CANCELLED)
+        elif job.task is not None:
+            job.task.cancel()
+        return job
+
+    def queue_position(self, job: Job) -> Optional[int]:
+        """1-based position of a queued job in scheduling order"""
+        if job.status != QUEUED:
+            return None
+        now = time.time()
+        ranked = sorted(self._queued, key=lambda j: self._score(j, now))
+        return ranked.index(job) + 1
+
+    def stats(self) -> dict:
+        counts = {state: 0 for state in (QUEUED, RUNNING) + FINISHED_STATES}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {"workers": self.workers, "max_queued": self.max_queued, **counts}
+
+    async def _dispatch(self):
+        while True:
+            async with self._wakeup:
+                await self._wakeup.wait_for(lambda: self._queued)
+                now = time.time()
+                job = min(self._queued, key=lambda j: self._score(j, now))
+                self._queued.remove(job)
+
+            job.status = RUNNING
+            job.started_at = time.time()
+            job.task = asyncio.ensure_future(job.run(job))
+            # wait() rather than awaiting the task, so cancelling the job
+            # does not look like this dispatcher being cancelled
+            await asyncio.wait([job.task])
+
+            if job.task.cancelled():
+                self._finish(job, CANCELLED)
+            elif job.task.exception() is not None:
+                error = job.task.exception()
+                logger.error(f"Job {job.id} failed: {error}")
+                job.error = str(error)
+                self._finish(job, FAILED)
+            else:
+                job.result = job.task.result()
+                self._finish(job, SUCCEEDED)
+            job.task = None
+
+    def _score(self, job: Job, now: float) -> float:
+        return job.cost - self.aging * (now - job.created_at)
+
+    def _queued_cost(self) -> float:
+        return sum(job.cost for job in self._queued)
+
+    def _finish(self, job: Job, status: str):
+        job.status = status
+        job.finished_at = time.time()
+        logger.info(f"Job {job.id} {status}")
+
+    def _prune(self):
+        now = time.time()
+        finished = [j for j in self._jobs.values() if j.status in FINISHED_STATES]
+        finished.sort(key=lambda j: j.finished_at)
+        excess = len(finished) - self.max_finished
+        for i, job in enumerate(finished):
+            if i < excess or now - job.finished_at > self.finished_ttl:
+                del self._jobs[job.id]
@@ -0,0 +1,251 @@
+"""
+Prometheus Metrics for MusicGen
+Minimal counters, gauges and histograms rendered in the Prometheus text
+exposition format, with per-stage latency helpers. Replica processes ship
+their observations to the parent with take_deltas()/merge().
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Bucket upper bounds (seconds) for request stages
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+MODEL_LOAD_BUCKETS = (1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """Base class: a named family of samples keyed by label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}_total{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+    def take_deltas(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values):
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Gauge(Metric):
+    """Gauge read from a callback at scrape time, returning a number or {label values: number}"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), callback: Callable = None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        values = self.callback() if self.callback is not None else None
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines = []
+        for key, value in sorted(values.items()):
+            if value is None:
+                continue
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=STAGE_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+    def take_deltas(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values):
+        with self._lock:
+            for key, (counts, total, count) in values.items():
+                state = self._values.get(key)
+                if state is None:
+                    state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+                state[0] = [a + b for a, b in zip(state[0], counts)]
+                state[1] += total
+                state[2] += count
+
+
+class MetricsRegistry:
+    """Set of metrics rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=(), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=STAGE_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            samples = metric.render()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def take_deltas(self) -> dict:
+        """Observations since the last call, reset locally (sent from replicas)"""
+        return {
+            name: metric.take_deltas()
+            for name, metric in self._metrics.items()
+            if hasattr(metric, "take_deltas")
+        }
+
+    def merge(self, deltas: Optional[dict]):
+        """Add observations taken in another process"""
+        for name, values in (deltas or {}).items():
+            metric = self._metrics.get(name)
+            if metric is not None and values:
+                metric.merge(values)
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "musicgen_stage_seconds",
+    "Time spent in each request stage",
+    ("stage",)
+)
+GENERATE_TOKENS_PER_SECOND = REGISTRY.histogram(
+    "musicgen_generate_tokens_per_second",
+    "Decoder steps per second of model.generate, times batch size",
+    buckets=TOKENS_PER_SECOND_BUCKETS
+)
+GENERATED_TOKENS = REGISTRY.counter(
+    "musicgen_generated_tokens",
+    "Decoder steps generated, times batch size"
+)
+GENERATIONS_ABORTED = REGISTRY.counter(
+    "musicgen_generations_aborted",
+    "Requests whose generation was stopped early, by reason (disconnect, cancelled)",
+    ("reason",)
+)
+ABORTED_TOKENS_SAVED = REGISTRY.counter(
+    "musicgen_aborted_tokens_saved",
+    "Decoder steps not run because a generation was stopped early, times batch size"
+)
+MODEL_LOAD_SECONDS = REGISTRY.histogram(
+    "musicgen_model_load_seconds",
+    "Time to load a model and its processor",
+    ("model",),
+    buckets=MODEL_LOAD_BUCKETS
+)
+
+
+@contextmanager
+def time_stage(stage: str):
+    """Record the duration of the enclosed block under `stage`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def take_deltas() -> dict:
+    """Module-level wrapper for REGISTRY.take_deltas (picklable for replica processes)"""
+    return REGISTRY.take_deltas()
+
+
+def merge_deltas(deltas: Optional[dict]):
+    REGISTRY.merge(deltas)
@@ -0,0 +1,36 @@
+"""
+Reduced-precision CPU execution for MusicGen
+fp32 (default), int8 dynamic quantization of the decoder's linear layers,
+or bfloat16 autocast around generation.
+"""
+
+import contextlib
+
+import torch
+
+PRECISIONS = ("fp32", "int8", "bf16")
+
+
+def apply_precision(model, precision: str):
+    """Prepare a freshly loaded model for the given precision mode (in place)"""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+
+    if precision == "int8":
+        # Weights stored as int8, activations quantized on the fly per batch.
+        # Only the decoder is quantized: it runs once per generated token and
+        # dominates CPU time, while the text encoder and EnCodec run once.
+        torch.ao.quantization.quantize_dynamic(
+            model.decoder,
+            {torch.nn.Linear},
+            dtype=torch.qint8,
+            inplace=True
+        )
+    return model
+
+
+def precision_context(precision: str):
+    """Context manager to wrap generate() in for the given precision mode"""
+    if precision == "bf16":
+        return torch.autocast("cpu", dtype=torch.bfloat16)
+    return contextlib.nullcontext()
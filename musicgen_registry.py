@@ -0,0 +1,194 @@
+"""
+On-demand Model Registry for MusicGen
+Loads models lazily on first use, tracks their memory footprint and evicts
+the least recently used ones to stay under a memory budget.
+"""
+
+import gc
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Model states reported by status()
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+RESIDENT = "resident"
+EVICTED = "evicted"
+
+
+def model_footprint_bytes(model) -> int:
+    """Bytes held by a torch module's weights, including quantized packed params"""
+    seen = set()
+
+    def tensor_bytes(value) -> int:
+        if isinstance(value, (tuple, list)):
+            return sum(tensor_bytes(v) for v in value)
+        if not hasattr(value, "element_size"):
+            return 0
+        # Tied weights show up under several names; count them once
+        key = (value.data_ptr(), value.numel())
+        if key in seen:
+            return 0
+        seen.add(key)
+        return value.numel() * value.element_size()
+
+    return sum(tensor_bytes(v) for v in model.state_dict().values())
+
+
+class ModelEntry:
+    """Bookkeeping for one registered model"""
+
+    def __init__(self, name: str, repo_id: str):
+        self.name = name
+        self.repo_id = repo_id
+        self.state = NOT_LOADED
+        self.model = None
+        self.processor = None
+        self.footprint_bytes = None
+        self.load_seconds = None
+        self.last_used = 0.0
+        self.users = 0
+        self.error = None
+        self.load_lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Lazily loaded, LRU-evicted set of (model, processor) pairs.
+
+    `loader(repo_id)` must return a `(model, processor)` tuple. Use
+    `acquire(name)` around every use of a model: it loads the model on first
+    use and pins it so it cannot be evicted while in use. When the resident
+    footprint exceeds `memory_budget_bytes`, idle models are evicted least
+    recently used first.
+    """
+
+    def __init__(
+        self,
+        models: Dict[str, str],
+        loader: Callable[[str], Tuple[Any, Any]],
+        memory_budget_bytes: Optional[int] = None
+    ):
+        self.loader = loader
+        self.memory_budget_bytes = memory_budget_bytes
+        self._entries = {name: ModelEntry(name, repo_id) for name, repo_id in models.items()}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    @contextmanager
+    def acquire(self, name: str):
+        """Yield `(model, processor)` for `name`, loading it if needed"""
+        entry = self._entries[name]
+
+        with entry.load_lock:
+            with self._lock:
+                entry.users += 1
+            try:
+                if entry.state != RESIDENT:
+                    self._load(entry)
+            except Exception:
+                with self._lock:
+                    entry.users -= 1
+                raise
+
+        try:
+            yield entry.model, entry.processor
+        finally:
+            with self._lock:
+                entry.users -= 1
+                entry.last_used = time.monotonic()
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(
+                e.footprint_bytes or 0 for e in self._entries.values() if e.state == RESIDENT
+            )
+
+    def status(self) -> dict:
+        """Per-model state, footprint and load time for /health"""
+        with self._lock:
+            models = {
+                name: {
+                    "repo_id": e.repo_id,
+                    "state": e.state,
+                    "footprint_mb": None if e.footprint_bytes is None else round(e.footprint_bytes / 2**20, 1),
+                    "load_seconds": e.load_seconds,
+                    "in_use": e.users,
+                    "error": e.error
+                }
+                for name, e in self._entries.items()
+            }
+        return {
+            "memory_budget_mb": None if self.memory_budget_bytes is None else round(self.memory_budget_bytes / 2**20, 1),
+            "resident_mb": round(self.resident_bytes() / 2**20, 1),
+            "models": models
+        }
+
+    def _load(self, entry: ModelEntry):
+        # Make room up front when we already know how big this model is
+        if entry.footprint_bytes is not None:
+            self._evict_to_fit(entry.footprint_bytes, keep=entry)
+
+        with self._lock:
+            entry.state = LOADING
+            entry.error = None
+
+        logger.info(f"Loading {entry.name} model ({entry.repo_id})...")
+        start = time.perf_counter()
+        try:
+            model, processor = self.loader(entry.repo_id)
+        except Exception as e:
+            with self._lock:
+                entry.state = NOT_LOADED if entry.footprint_bytes is None else EVICTED
+                entry.error = str(e)
+            raise
+
+        footprint = model_footprint_bytes(model)
+        with self._lock:
+            entry.model = model
+            entry.processor = processor
+            entry.footprint_bytes = footprint
+            entry.load_seconds = round(time.perf_counter() - start, 2)
+            entry.last_used = time.monotonic()
+            entry.state = RESIDENT
+
+        logger.info(
+            f"✓ {entry.name} model loaded in {entry.load_seconds}s "
+            f"({footprint / 2**20:.0f} MB)"
+        )
+        self._evict_to_fit(0, keep=entry)
+
+    def _evict_to_fit(self, incoming_bytes: int, keep: ModelEntry):
+        if self.memory_budget_bytes is None:
+            return
+
+        evicted = []
+        with self._lock:
+            resident = sorted(
+                (e for e in self._entries.values() if e.state == RESIDENT and e is not keep),
+                key=lambda e: e.last_used
+            )
+            used = sum(e.footprint_bytes for e in resident)
+            if keep.state == RESIDENT:
+                used += keep.footprint_bytes
+
+            for e in resident:
+                if used + incoming_bytes <= self.memory_budget_bytes:
+                    break
+                if e.users > 0:
+                    continue
+                e.model = None
+                e.processor = None
+                e.state = EVICTED
+                used -= e.footprint_bytes
+                evicted.append(e.name)
+
+        if evicted:
+            gc.collect()
+            logger.info(f"Evicted {', '.join(evicted)} to stay under memory budget")
@@ -0,0 +1,325 @@
+"""
+Multi-replica MusicGen Worker Pool
+Pre-forks worker processes that each run one generation at a time with a
+pinned torch thread budget, and routes work to the least-loaded replica.
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from musicgen_executor import InferenceExecutor, ExecutorSaturated
+
+logger = logging.getLogger(__name__)
+
+
+def _replica_main(
+    conn,
+    index: int,
+    num_threads: int,
+    status_fn: Optional[Callable[[], dict]],
+    report_fn: Optional[Callable[[], Any]]
+):
+    """Replica process loop: run submitted calls one at a time and report back"""
+    import torch
+    torch.set_num_threads(num_threads)
+
+    if report_fn is not None:
+        # Drop anything inherited from the parent at fork time
+        report_fn()
+
+    send_lock = threading.Lock()
+    jobs = queue.Queue()
+    cancel_events = {}
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def receive():
+        # Read on a separate thread so control messages are seen while a job runs
+        try:
+            while True:
+                message = conn.recv()
+                if message[0] == "stop":
+                    break
+                if message[0] == "cancel":
+                    event = cancel_events.get(message[1])
+                    if event is not None:
+                        event.set()
+                    continue
+                if message[6]:
+                    # Registered on receipt so a cancel can arrive while queued
+                    cancel_events[message[1]] = threading.Event()
+                jobs.put(message)
+        except (EOFError, OSError):
+            pass
+        jobs.put(None)
+
+    threading.Thread(target=receive, daemon=True).start()
+    send(("ready", os.getpid(), status_fn() if status_fn else None))
+
+    while True:
+        message = jobs.get()
+        if message is None:
+            break
+        _, job_id, fn, args, kwargs, wants_emit, cancellable = message
+
+        if wants_emit:
+            kwargs["emit"] = lambda chunk, job_id=job_id: send(("emit", job_id, chunk))
+        if cancellable:
+            kwargs["cancel_event"] = cancel_events[job_id]
+
+        try:
+            if cancellable and kwargs["cancel_event"].is_set():
+                raise RuntimeError("Cancelled before starting")
+            result = fn(*args, **kwargs)
+            reply = ("result", job_id, result)
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+                reply = ("error", job_id, e)
+            except Exception:
+                reply = ("error", job_id, RuntimeError(f"{type(e).__name__}: {e}"))
+        cancel_events.pop(job_id, None)
+        if report_fn is not None:
+            send(("report", None, report_fn()))
+        send(reply)
+
+        if status_fn is not None:
+            send(("status", None, status_fn()))
+
+
+class Replica:
+    """Parent-side handle of one worker process"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.pid = None
+        self.alive = False
+        self.in_flight = 0
+        self.completed = 0
+        self.restarts = 0
+        self.status = None
+        self.send_lock = threading.Lock()
+
+
+class ReplicaPool(InferenceExecutor):
+    """
+    Pool of pre-forked inference processes with the InferenceExecutor API.
+
+    Models loaded in the parent before `start()` are inherited copy-on-write
+    by every replica on platforms with fork. Each replica sets
+    `torch.set_num_threads(threads_per_replica)` and runs one call at a
+    time, so replicas do not oversubscribe cores. `run()` routes to the
+    replica with the fewest calls in flight. A callable passed as `emit=`
+    is invoked in the parent (from a reader thread) with every chunk the
+    replica emits, which is how streaming responses cross the process
+    boundary. After every call a replica sends `report_fn()` (e.g. metric
+    observations) to the parent, which hands it to `on_report`. Cancelling
+    a `cancellable=True` call sets the `cancel_event` the replica passed to
+    the callable.
+    """
+
+    def __init__(
+        self,
+        replicas: int,
+        threads_per_replica: int,
+        max_pending: int = 16,
+        status_fn: Optional[Callable[[], dict]] = None,
+        report_fn: Optional[Callable[[], Any]] = None,
+        on_report: Optional[Callable[[Any], None]] = None
+    ):
+        super().__init__(max_workers=replicas, max_pending=max_pending)
+        self.threads_per_replica = max(1, threads_per_replica)
+        self.status_fn = status_fn
+        self.report_fn = report_fn
+        self.on_report = on_report
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        self._replicas = [Replica(i) for i in range(self.max_workers)]
+        self._jobs = {}
+        self._job_ids = itertools.count()
+        self._closing = False
+        self._started = False
+
+    def start(self):
+        """Fork all replicas and wait until each has reported in"""
+        for replica in self._replicas:
+            self._spawn(replica)
+        self._started = True
+        logger.info(
+            f"✓ {len(self._replicas)} MusicGen replicas running "
+            f"({self.threads_per_replica} threads each)"
+        )
+
+    async def run(
+        self,
+        fn: Callable,
+        *args,
+        emit: Optional[Callable] = None,
+        cancellable: bool = False,
+        **kwargs
+    ) -> Any:
+        """Run `fn(*args, **kwargs)` on the least-loaded replica"""
+        if not self._started:
+            # Models are still loading in the parent; clients should retry
+            raise ExecutorSaturated(self.retry_after())
+        with self._lock:
+            live = [r for r in self._replicas if r.alive]
+            if not live:
+                raise RuntimeError("No inference replicas available")
+            replica = min(live, key=lambda r: r.in_flight)
+        return await self._run_on(replica, fn, args, kwargs, emit, cancellable)
+
+    async def run_on_all(self, fn: Callable, *args, **kwargs) -> list:
+        """Run `fn(*args, **kwargs)` on every live replica, e.g. to warm per-process caches"""
+        live = [r for r in self._replicas if r.alive]
+        return await asyncio.gather(*(self._run_on(r, fn, args, dict(kwargs), None, False) for r in live))
+
+    async def _run_on(self, replica: Replica, fn: Callable, args, kwargs, emit, cancellable) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        with self._lock:
+            replica.in_flight += 1
+            self._running += 1
+            job_id = next(self._job_ids)
+            self._jobs[job_id] = (replica, loop, future, emit, time.perf_counter())
+
+        try:
+            with replica.send_lock:
+                replica.conn.send(("run", job_id, fn, args, kwargs, emit is not None, cancellable))
+        except Exception as e:
+            self._finish(job_id, error=e)
+
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # The replica stays busy until the callable notices and returns
+            if cancellable:
+                try:
+                    with replica.send_lock:
+                        replica.conn.send(("cancel", job_id))
+                except Exception:
+                    pass
+            raise
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["threads_per_replica"] = self.threads_per_replica
+        stats["replicas"] = [
+            {
+                "index": r.index,
+                "pid": r.pid,
+                "alive": r.alive,
+                "in_flight": r.in_flight,
+                "completed": r.completed,
+                "restarts": r.restarts,
+                "models": r.status
+            }
+            for r in self._replicas
+        ]
+        return stats
+
+    def shutdown(self):
+        self._closing = True
+        for replica in self._replicas:
+            try:
+                with replica.send_lock:
+                    replica.conn.send(("stop",))
+            except Exception:
+                pass
+        for replica in self._replicas:
+            if replica.process is not None:
+                replica.process.join(timeout=5)
+                if replica.process.is_alive():
+                    replica.process.terminate()
+        super().shutdown()
+
+    def _spawn(self, replica: Replica):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_replica_main,
+            args=(child_conn, replica.index, self.threads_per_replica, self.status_fn, self.report_fn),
+            name=f"musicgen-replica-{replica.index}",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+
+        # First message is the readiness handshake
+        _, pid, status = parent_conn.recv()
+        replica.process = process
+        replica.conn = parent_conn
+        replica.pid = pid
+        replica.status = status
+        replica.alive = True
+
+        threading.Thread(
+            target=self._read_replies,
+            args=(replica, parent_conn),
+            name=f"musicgen-replica-reader-{replica.index}",
+            daemon=True
+        ).start()
+
+    def _read_replies(self, replica: Replica, conn):
+        try:
+            while True:
+                kind, job_id, payload = conn.recv()
+                if kind == "emit":
+                    job = self._jobs.get(job_id)
+                    if job is not None and job[3] is not None:
+                        job[3](payload)
+                elif kind == "status":
+                    replica.status = payload
+                elif kind == "report":
+                    if self.on_report is not None:
+                        self.on_report(payload)
+                elif kind == "result":
+                    self._finish(job_id, result=payload)
+                elif kind == "error":
+                    self._finish(job_id, error=payload)
+        except (EOFError, OSError):
+            pass
+
+        replica.alive = False
+        with self._lock:
+            orphaned = [job_id for job_id, job in self._jobs.items() if job[0] is replica]
+        for job_id in orphaned:
+            self._finish(job_id, error=RuntimeError(f"Inference replica {replica.index} exited"))
+
+        if not self._closing:
+            logger.error(f"Replica {replica.index} (pid {replica.pid}) exited, restarting")
+            replica.restarts += 1
+            self._spawn(replica)
+
+    def _finish(self, job_id: int, result: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return
+            replica, loop, future, _, started = job
+            replica.in_flight -= 1
+            replica.completed += 1
+            self._running -= 1
+        self._record_task(time.perf_counter() - started)
+
+        def resolve():
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        loop.call_soon_threadsafe(resolve)
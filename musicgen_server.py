@@ -5,24 +5,57 @@ Runs a FastAPI server that generates music using Meta's MusicGen model locally.
 No API key required - runs entirely on your machine.
 """
 
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form
+import time
+# Fallback for cold-start reporting when the process start time is unavailable
+IMPORT_TIME = time.time()
+
+from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from transformers import MusicgenForConditionalGeneration, AutoProcessor
 import torch
-import scipy.io.wavfile
 import numpy as np
 import os
-import tempfile
+import sys
 import logging
-import io
 import base64
+import asyncio
+import hashlib
+from typing import List, Literal, Optional
+
+from musicgen_batching import GenerationBatcher
+from musicgen_executor import InferenceExecutor, ExecutorSaturated, RandomStateLock
+from musicgen_replicas import ReplicaPool
+from musicgen_streaming import (
+    MusicgenAudioStreamer,
+    AUDIO_MEDIA_TYPES,
+    encode_audio,
+    wav_stream_header,
+    float_to_pcm16
+)
+from musicgen_registry import ModelRegistry
+from musicgen_cache import MemoryCache, ResultCache, cache_key
+from musicgen_snapshot import snapshot_path, has_snapshot, load_snapshot
+from musicgen_precision import PRECISIONS, apply_precision, precision_context
+from musicgen_jobs import JobQueue, RUNNING, SUCCEEDED, GenerationCancelled, monitor_kwargs
+from musicgen_text_cache import TextEncoderCache
+from musicgen_metrics import (
+    REGISTRY,
+    GENERATE_TOKENS_PER_SECOND,
+    GENERATED_TOKENS,
+    GENERATIONS_ABORTED,
+    ABORTED_TOKENS_SAVED,
+    MODEL_LOAD_SECONDS,
+    time_stage,
+    take_deltas,
+    merge_deltas
+)
 
-try:
-    import librosa
-    HAS_LIBROSA = True
-except ImportError:
-    HAS_LIBROSA = False
+# Audio ingest is shared with the humming server in backend/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from audio_ingest import AudioIngestError, read_upload, decode_audio, resample
+from process_info import process_start_time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -39,244 +72,1022 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global models and processors
-text_model = None
-text_processor = None
-melody_model = None
-melody_processor = None
+# Batching settings for text-to-music
+BATCH_MAX_SIZE = int(os.environ.get("MUSICGEN_BATCH_MAX_SIZE", "8"))
+BATCH_WINDOW_MS = float(os.environ.get("MUSICGEN_BATCH_WINDOW_MS", "50"))
+
+# Inference worker settings
+INFERENCE_WORKERS = int(os.environ.get("MUSICGEN_INFERENCE_WORKERS", "1"))
+INFERENCE_MAX_PENDING = int(os.environ.get("MUSICGEN_MAX_PENDING", "16"))
+
+# Pre-forked replica processes (0 runs inference on in-process threads instead)
+REPLICAS = int(os.environ.get("MUSICGEN_REPLICAS", "0"))
+THREADS_PER_REPLICA = int(os.environ.get(
+    "MUSICGEN_THREADS_PER_REPLICA",
+    str(max(1, (os.cpu_count() or 1) // max(1, REPLICAS)))
+))
+# Models loaded in the background at startup and warmed up before reporting
+# ready (with replicas, loaded before forking so they share weights copy-on-write)
+PRELOAD_MODELS = [
+    name.strip()
+    for name in os.environ.get("MUSICGEN_PRELOAD", os.environ.get("MUSICGEN_REPLICA_PRELOAD", "text")).split(",")
+    if name.strip()
+]
+# Decoder steps of the warmup generate per preloaded model (0 skips warmup)
+WARMUP_STEPS = int(os.environ.get("MUSICGEN_WARMUP_STEPS", "10"))
+
+# Seconds between checks for a disconnected client while a generation runs
+DISCONNECT_POLL_S = float(os.environ.get("MUSICGEN_DISCONNECT_POLL_S", "0.5"))
+
+# Decoder steps between streamed audio chunks (50 steps ~ 1 second)
+STREAM_PLAY_STEPS = int(os.environ.get("MUSICGEN_STREAM_PLAY_STEPS", "50"))
+
+# Long-form generation: windows of LONG_WINDOW_S, each continuing the last
+# LONG_CONTEXT_S of audio, crossfaded over LONG_CROSSFADE_S at the seams
+LONG_WINDOW_S = float(os.environ.get("MUSICGEN_LONG_WINDOW_S", "20"))
+LONG_CONTEXT_S = float(os.environ.get("MUSICGEN_LONG_CONTEXT_S", "5"))
+LONG_CROSSFADE_S = float(os.environ.get("MUSICGEN_LONG_CROSSFADE_S", "0.25"))
+LONG_MAX_DURATION_S = float(os.environ.get("MUSICGEN_LONG_MAX_DURATION_S", "600"))
+if not 0 < LONG_CROSSFADE_S <= LONG_CONTEXT_S < LONG_WINDOW_S - LONG_CROSSFADE_S:
+    raise ValueError("Long-form settings need 0 < crossfade <= context < window - crossfade")
+
+# Models are loaded on first use; 0 means no memory budget (never evict)
+MUSICGEN_MODELS = {
+    "text": "facebook/musicgen-small",
+    "melody": "facebook/musicgen-melody"
+}
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get("MUSICGEN_MEMORY_BUDGET_MB", "0"))
+
+# Local snapshots exported by musicgen_snapshot.py; models found there are
+# loaded with memory-mapped weights instead of from the HuggingFace cache
+SNAPSHOT_DIR = os.environ.get("MUSICGEN_SNAPSHOT_DIR")
+
+# CPU precision mode: fp32, int8 (dynamic quantization of the decoder) or bf16 (autocast)
+PRECISION = os.environ.get("MUSICGEN_PRECISION", "fp32")
+if PRECISION not in PRECISIONS:
+    raise ValueError(f"MUSICGEN_PRECISION must be one of {PRECISIONS}, got '{PRECISION}'")
+
+def load_musicgen(repo_id: str):
+    """Load a MusicGen model and its processor on CPU, from a local snapshot if there is one"""
+    start = time.perf_counter()
+    snapshot = snapshot_path(SNAPSHOT_DIR, repo_id) if SNAPSHOT_DIR else None
+    if has_snapshot(snapshot):
+        logger.info(f"Loading {repo_id} from snapshot {snapshot} (memory-mapped)")
+        model, processor = load_snapshot(snapshot, MusicgenForConditionalGeneration)
+    else:
+        model = MusicgenForConditionalGeneration.from_pretrained(
+            repo_id,
+            trust_remote_code=True
+        )
+        model.eval()
+        processor = AutoProcessor.from_pretrained(
+            repo_id,
+            trust_remote_code=True
+        )
+    apply_precision(model, PRECISION)
+    MODEL_LOAD_SECONDS.observe(time.perf_counter() - start, model=repo_id)
+    return model, processor
+
+model_registry = ModelRegistry(
+    MUSICGEN_MODELS,
+    load_musicgen,
+    memory_budget_bytes=int(MODEL_MEMORY_BUDGET_MB * 2**20) or None
+)
+text_batcher = None
+
+def model_status() -> dict:
+    """Registry status, reported by each replica process"""
+    return model_registry.status()
+
+def preload_model(name: str):
+    with model_registry.acquire(name):
+        pass
+
+def warmup_models(names, steps: int = WARMUP_STEPS):
+    """Run a short generate on each model so lazy initialization is not paid by the first request"""
+    for name in names:
+        with model_registry.acquire(name) as (model, processor):
+            inputs = processor(text=["warmup"], padding=True, return_tensors="pt")
+            with torch.no_grad(), precision_context(PRECISION):
+                model.generate(**inputs, max_new_tokens=steps)
+
+# Startup progress for /health: loading -> warming_up -> ready (or failed)
+PROCESS_START = process_start_time(fallback=IMPORT_TIME)
+startup = {
+    "phase": "starting",
+    "models_loaded": 0,
+    "models_total": len(PRELOAD_MODELS),
+    "ready_seconds": None,
+    "first_request_seconds": None,
+    "error": None
+}
+
+# Disk cache for seeded generations (0 disables)
+CACHE_DIR = os.environ.get("MUSICGEN_CACHE_DIR", "musicgen_cache")
+CACHE_MAX_MB = float(os.environ.get("MUSICGEN_CACHE_MAX_MB", "1024"))
+result_cache = ResultCache(CACHE_DIR, int(CACHE_MAX_MB * 2**20)) if CACHE_MAX_MB > 0 else None
+
+# In-memory cache of decoded melodies and their conditioning features, keyed
+# by upload hash, so prompt iterations on one melody skip decode and chroma (0 disables)
+MELODY_CACHE_MB = float(os.environ.get("MUSICGEN_MELODY_CACHE_MB", "256"))
+melody_feature_cache = MemoryCache(int(MELODY_CACHE_MB * 2**20)) if MELODY_CACHE_MB > 0 else None
+
+# In-memory cache of T5 encoder outputs per normalized prompt (0 disables), and
+# an optional file of preset prompts (one per line) to encode at startup
+TEXT_CACHE_MB = float(os.environ.get("MUSICGEN_TEXT_CACHE_MB", "64"))
+text_encoder_cache = TextEncoderCache(int(TEXT_CACHE_MB * 2**20)) if TEXT_CACHE_MB > 0 else None
+PRESET_PROMPTS_FILE = os.environ.get("MUSICGEN_PRESET_PROMPTS_FILE")
+
+if REPLICAS > 0:
+    inference_executor = ReplicaPool(
+        replicas=REPLICAS,
+        threads_per_replica=THREADS_PER_REPLICA,
+        max_pending=INFERENCE_MAX_PENDING,
+        status_fn=model_status,
+        report_fn=take_deltas,
+        on_report=merge_deltas
+    )
+else:
+    inference_executor = InferenceExecutor(
+        max_workers=INFERENCE_WORKERS,
+        max_pending=INFERENCE_MAX_PENDING
+    )
+
+# torch.Generator cannot be passed through generate(), so seeded runs on
+# concurrent inference threads take the global RNG to themselves
+random_state_lock = RandomStateLock()
+
+# Asynchronous job queue (workers default to the inference worker/replica count)
+JOB_WORKERS = int(os.environ.get("MUSICGEN_JOB_WORKERS", str(inference_executor.max_workers)))
+JOB_MAX_QUEUED = int(os.environ.get("MUSICGEN_JOB_MAX_QUEUED", "64"))
+JOB_RESULT_TTL_S = float(os.environ.get("MUSICGEN_JOB_RESULT_TTL_S", "3600"))
+# Seconds of requested audio forgiven per second a job waits, so long jobs are not starved
+JOB_AGING = float(os.environ.get("MUSICGEN_JOB_AGING", "0.1"))
+
+job_queue = JobQueue(
+    workers=JOB_WORKERS,
+    max_queued=JOB_MAX_QUEUED,
+    finished_ttl=JOB_RESULT_TTL_S,
+    aging=JOB_AGING
+)
 
 class GenerateRequest(BaseModel):
     prompt: str
     duration: float = 10.0
+    seed: Optional[int] = None
+    temperature: Optional[float] = None
+    top_k: Optional[int] = None
+    top_p: Optional[float] = None
+    guidance_scale: Optional[float] = None
+    # "json" returns base64 WAV in GenerateResponse; the others return the audio file as the body
+    response_format: Literal["json", "wav", "flac", "ogg"] = "json"
+    # Defaults to float32 for json (backwards compatible) and int16 otherwise
+    sample_format: Optional[Literal["int16", "float32"]] = None
+
+class PrewarmRequest(BaseModel):
+    prompts: List[str]
+    models: List[Literal["text", "melody"]] = ["text"]
 
 class GenerateResponse(BaseModel):
     success: bool
     audio_base64: str = None
     error: str = None
 
-@app.on_event("startup")
-async def load_models():
-    """Load MusicGen models on startup"""
-    global text_model, text_processor, melody_model, melody_processor
-    try:
-        logger.info("Loading MusicGen models on CPU...")
-        
-        # Load text-to-music model
-        logger.info("1/2 Loading text-to-music model...")
-        text_model = MusicgenForConditionalGeneration.from_pretrained(
-            "facebook/musicgen-small",
-            trust_remote_code=True
+def audio_response(audio: np.ndarray, sampling_rate: int, response_format: str = "json", sample_format: str = None):
+    """Build the endpoint response: base64 WAV in JSON, or the encoded audio as the raw body"""
+    if response_format == "json":
+        with time_stage("wav_encode"):
+            wav_bytes = encode_audio(audio, sampling_rate, "wav", sample_format or "float32")
+        with time_stage("base64"):
+            audio_base64 = base64.b64encode(wav_bytes).decode('utf-8')
+        return GenerateResponse(
+            success=True,
+            audio_base64=audio_base64
         )
-        text_processor = AutoProcessor.from_pretrained(
-            "facebook/musicgen-small",
-            trust_remote_code=True
+    
+    with time_stage(f"{response_format}_encode"):
+        content = encode_audio(audio, sampling_rate, response_format, sample_format or "int16")
+    return Response(
+        content=content,
+        media_type=AUDIO_MEDIA_TYPES[response_format]
+    )
+
+def error_response(error: str, response_format: str = "json"):
+    """Failure response matching the requested format"""
+    if response_format == "json":
+        return GenerateResponse(success=False, error=error)
+    return JSONResponse(status_code=500, content={"success": False, "error": error})
+
+async def read_audio_upload(audio_file: UploadFile) -> bytes:
+    """Read an uploaded melody into memory within the upload size limit"""
+    with time_stage("upload_read"):
+        return await read_upload(audio_file)
+
+def sampling_params(temperature=None, top_k=None, top_p=None, guidance_scale=None) -> dict:
+    """Generation kwargs for the sampling parameters a request overrides"""
+    params = {
+        "temperature": temperature,
+        "top_k": top_k,
+        "top_p": top_p,
+        "guidance_scale": guidance_scale
+    }
+    return {name: value for name, value in params.items() if value is not None}
+
+def run_generate(
+    model,
+    inputs,
+    max_new_tokens: int,
+    sampling: dict = None,
+    seed: int = None,
+    on_step=None,
+    cancel_event=None,
+    **kwargs
+):
+    """
+    Seed the RNG if requested and run model.generate without autograd at the configured precision.
+    
+    A seeded run has the RNG to itself (see random_state_lock), so its
+    output does not depend on generations running alongside it.
+    `on_step(steps)` gets decoder progress; once `cancel_event` is set the
+    decode loop stops at the next step and GenerationCancelled is raised.
+    """
+    if cancel_event is not None and cancel_event.is_set():
+        raise GenerationCancelled("Generation cancelled before it started")
+    monitor = monitor_kwargs(on_step, cancel_event)
+    start = time.perf_counter()
+    try:
+        with random_state_lock.exclusive() if seed is not None else random_state_lock.shared():
+            if seed is not None:
+                torch.manual_seed(seed)
+            with time_stage("generate"), torch.no_grad(), precision_context(PRECISION):
+                audio_values = model.generate(
+                    **inputs, max_new_tokens=max_new_tokens, **(sampling or {}), **monitor, **kwargs
+                )
+    except Exception:
+        # Undoing the delay pattern of a cut-short sequence can fail; the result is unwanted anyway
+        if cancel_event is None or not cancel_event.is_set():
+            raise
+    
+    # Melody requests without a prompt carry only the audio conditioning
+    batch_size = (inputs["input_ids"] if "input_ids" in inputs else inputs["input_values"]).shape[0]
+    steps = monitor["stopping_criteria"][0].steps if monitor else max_new_tokens
+    GENERATED_TOKENS.inc(steps * batch_size)
+    if cancel_event is not None and cancel_event.is_set():
+        ABORTED_TOKENS_SAVED.inc(max(0, max_new_tokens - steps) * batch_size)
+        raise GenerationCancelled(f"Generation cancelled after {steps} of {max_new_tokens} steps")
+    
+    GENERATE_TOKENS_PER_SECOND.observe(steps * batch_size / (time.perf_counter() - start))
+    return audio_values.float()
+
+def text_inputs(name: str, model, processor, prompts, sampling: dict = None) -> dict:
+    """Text conditioning for generate(): cached encoder outputs, or plain tokenization if the cache is off"""
+    if text_encoder_cache is None:
+        with time_stage("text_encode"):
+            return processor(text=prompts, padding=True, return_tensors="pt")
+    
+    with time_stage("text_encode"), torch.no_grad(), precision_context(PRECISION):
+        return text_encoder_cache.generate_inputs(
+            name, model, processor, prompts, (sampling or {}).get("guidance_scale")
         )
-        logger.info("✓ Text-to-music model loaded")
+
+def prewarm_text_cache(prompts, models=("text",)) -> int:
+    """Encode preset prompts ahead of time so their first request skips the text encoder"""
+    if text_encoder_cache is None or not prompts:
+        return 0
+    for name in models:
+        with model_registry.acquire(name) as (model, processor):
+            with torch.no_grad(), precision_context(PRECISION):
+                text_encoder_cache.encode(name, model, processor, prompts)
+    return len(prompts)
+
+def generate_text_batch(prompts, max_new_tokens: int, sampling: dict = None, seed: int = None, **generate_kwargs):
+    """Generate one padded batch of text prompts, returning (waveform, sampling_rate) per prompt"""
+    with model_registry.acquire("text") as (model, processor):
+        inputs = text_inputs("text", model, processor, prompts, sampling)
         
-        # Load melody-to-music model
-        logger.info("2/2 Loading melody-to-music model...")
-        melody_model = MusicgenForConditionalGeneration.from_pretrained(
-            "facebook/musicgen-melody",
-            trust_remote_code=True
-        )
-        melody_processor = AutoProcessor.from_pretrained(
-            "facebook/musicgen-melody",
-            trust_remote_code=True
+        audio_values = run_generate(model, inputs, max_new_tokens, sampling, seed, **generate_kwargs)
+        
+        sampling_rate = model.config.audio_encoder.sampling_rate
+    
+    return [(audio_values[i, 0].cpu().numpy(), sampling_rate) for i in range(len(prompts))]
+
+def load_melody_audio(audio_bytes: bytes, target_sr: int):
+    """Decode an uploaded melody in memory and resample it to the melody model's rate"""
+    with time_stage("decode"):
+        audio_data, sample_rate = decode_audio(audio_bytes, preferred_sr=target_sr)
+    if sample_rate != target_sr:
+        with time_stage("resample"):
+            audio_data = resample(audio_data, sample_rate, target_sr)
+        sample_rate = target_sr
+    logger.info(f"Loaded melody: {len(audio_data) / sample_rate:.1f}s at {sample_rate}Hz")
+    return audio_data, sample_rate
+
+def melody_conditioning(melody_processor, audio_bytes: bytes, target_sr: int) -> dict:
+    """Audio conditioning tensors for an uploaded melody, cached by upload hash"""
+    key = (hashlib.sha256(audio_bytes).hexdigest(), target_sr)
+    if melody_feature_cache is not None:
+        features = melody_feature_cache.get(key)
+        if features is not None:
+            logger.info("Using cached melody features")
+            return features
+    
+    audio_data, sample_rate = load_melody_audio(audio_bytes, target_sr)
+    
+    # Audio-only processor pass: these tensors do not depend on the prompt
+    with time_stage("processor"):
+        inputs = melody_processor(
+            audio=audio_data,
+            sampling_rate=sample_rate,
+            padding=True,
+            return_tensors="pt"
         )
-        logger.info("✓ Melody-to-music model loaded")
+    features = dict(inputs)
+    
+    # Ensure correct key names for model
+    if 'input_features' in features:
+        features['input_values'] = features.pop('input_features')
+    
+    if melody_feature_cache is not None:
+        melody_feature_cache.put(key, features)
+    return features
+
+def build_melody_inputs(model, melody_processor, features: dict, prompt: str, sampling: dict = None) -> dict:
+    """Combine melody conditioning features with an optional encoded text prompt"""
+    inputs = {}
+    if prompt:
+        inputs.update(text_inputs("melody", model, melody_processor, [prompt], sampling))
+    inputs.update(features)
+    return inputs
+
+def generate_melody(
+    audio_bytes: bytes,
+    prompt: str,
+    duration: float,
+    sampling: dict = None,
+    seed: int = None,
+    **generate_kwargs
+):
+    """Blocking melody-to-music generation, run on an inference worker"""
+    with model_registry.acquire("melody") as (model, processor):
+        sampling_rate = model.config.audio_encoder.sampling_rate
+        features = melody_conditioning(processor, audio_bytes, sampling_rate)
+        inputs = build_melody_inputs(model, processor, features, prompt, sampling)
         
-        logger.info("✓ Both models loaded successfully on CPU!")
-    except Exception as e:
-        logger.error(f"Failed to load models: {e}")
-        logger.exception(e)
+        max_new_tokens = int(duration * 50)
+        
+        # Generate
+        audio_values = run_generate(model, inputs, max_new_tokens, sampling, seed, **generate_kwargs)
+    
+    return audio_values[0, 0].cpu().numpy(), sampling_rate
+
+def generate_text_job(prompt: str, max_new_tokens: int, sampling: dict, seed: Optional[int], emit=None, cancel_event=None):
+    """Job worker: one unbatched text generation reporting decoder steps through `emit`"""
+    results = generate_text_batch([prompt], max_new_tokens, sampling, seed, on_step=emit, cancel_event=cancel_event)
+    return results[0]
+
+def generate_melody_job(audio_bytes: bytes, prompt: str, duration: float, sampling: dict, seed: Optional[int], emit=None, cancel_event=None):
+    """Job worker: melody generation reporting decoder steps through `emit`"""
+    return generate_melody(audio_bytes, prompt, duration, sampling, seed, on_step=emit, cancel_event=cancel_event)
+
+def stream_generate(model, inputs, max_new_tokens: int, emit, sampling: dict = None, seed: int = None, cancel_event=None):
+    """Blocking generate that emits a WAV header, then PCM chunks as they are decoded"""
+    emit(wav_stream_header(model.config.audio_encoder.sampling_rate))
+    
+    def on_audio(chunk):
+        emit(None if chunk is None else float_to_pcm16(chunk))
+    
+    streamer = MusicgenAudioStreamer(model, on_audio, play_steps=STREAM_PLAY_STEPS)
+    run_generate(model, inputs, max_new_tokens, sampling, seed, cancel_event=cancel_event, streamer=streamer)
+
+def stream_text(prompt: str, max_new_tokens: int, sampling: dict, seed: Optional[int], emit, cancel_event=None):
+    with model_registry.acquire("text") as (model, processor):
+        inputs = text_inputs("text", model, processor, [prompt], sampling)
+        stream_generate(model, inputs, max_new_tokens, emit, sampling, seed, cancel_event)
+
+def stream_melody(
+    audio_bytes: bytes,
+    prompt: str,
+    max_new_tokens: int,
+    sampling: dict,
+    seed: Optional[int],
+    emit,
+    cancel_event=None
+):
+    with model_registry.acquire("melody") as (model, processor):
+        features = melody_conditioning(processor, audio_bytes, model.config.audio_encoder.sampling_rate)
+        inputs = build_melody_inputs(model, processor, features, prompt, sampling)
+        stream_generate(model, inputs, max_new_tokens, emit, sampling, seed, cancel_event)
+
+def stream_long(prompt: str, max_new_tokens: int, sampling: dict, seed: Optional[int], emit, cancel_event=None):
+    """
+    Blocking long-form generation in overlapping windows, emitting a 16-bit WAV stream.
+    
+    Each window after the first is an audio-prompt continuation of the last
+    LONG_CONTEXT_S of the previous one, so the model's cache never grows past
+    one window and memory stays flat however long the track is. The end of
+    each window is held back and crossfaded into the next window's
+    re-decoded context to hide the seam.
+    """
+    with model_registry.acquire("text") as (model, processor):
+        sampling_rate = model.config.audio_encoder.sampling_rate
+        hop_length = int(np.prod(model.config.audio_encoder.upsampling_ratios))
+        frame_rate = sampling_rate / hop_length
+        window_tokens = int(LONG_WINDOW_S * frame_rate)
+        context_tokens = int(LONG_CONTEXT_S * frame_rate)
+        context_samples = context_tokens * hop_length
+        crossfade = int(LONG_CROSSFADE_S * sampling_rate)
+        fade_in = np.linspace(0.0, 1.0, crossfade, dtype=np.float32)
+        # The delay pattern leaves the last num_codebooks - 1 steps of a window incomplete
+        delay_steps = model.decoder.num_codebooks - 1
+        if window_tokens - context_tokens <= delay_steps + crossfade / hop_length:
+            raise ValueError("Long-form window is too short for its context and crossfade")
+        
+        emit(wav_stream_header(sampling_rate))
+        
+        tail = None
+        held_back = None
+        remaining = max_new_tokens
+        window = 0
+        while remaining > 0:
+            # Each window is seeded on its own: other generations may draw from the RNG in between
+            window_seed = None if seed is None else seed + window
+            window += 1
+            if tail is None:
+                new_tokens = min(remaining + delay_steps, window_tokens)
+                inputs = text_inputs("text", model, processor, [prompt], sampling)
+                audio = run_generate(model, inputs, new_tokens, sampling, window_seed, cancel_event=cancel_event)[0, 0].cpu().numpy()
+                prompt_samples = 0
+            else:
+                new_tokens = min(remaining + delay_steps, window_tokens - context_tokens)
+                inputs = {
+                    **text_inputs("text", model, processor, [prompt], sampling),
+                    **processor(audio=tail, sampling_rate=sampling_rate, return_tensors="pt")
+                }
+                # Output starts with the re-decoded audio prompt
+                audio = run_generate(model, inputs, new_tokens, sampling, window_seed, cancel_event=cancel_event)[0, 0].cpu().numpy()
+                prompt_samples = len(tail)
+                overlap = audio[prompt_samples - crossfade:prompt_samples]
+                emit(float_to_pcm16(held_back * (1.0 - fade_in) + overlap * fade_in))
+            
+            new_audio = audio[prompt_samples:prompt_samples + remaining * hop_length]
+            remaining -= len(new_audio) // hop_length
+            logger.info(f"Long-form window done, {remaining / frame_rate:.1f}s left")
+            
+            if remaining > 0:
+                emit(float_to_pcm16(new_audio[:-crossfade]))
+                held_back = new_audio[-crossfade:]
+                tail = audio[-context_samples:]
+            else:
+                emit(float_to_pcm16(new_audio))
+        
+        emit(None)
+
+def audio_stream_response(fn, *args) -> StreamingResponse:
+    """Run a streaming generation on an inference worker and relay its bytes as a WAV stream"""
+    inference_executor.reserve()
+    
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+    
+    def emit(chunk):
+        loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+    
+    task = asyncio.ensure_future(inference_executor.run(fn, *args, emit=emit, cancellable=True))
+    # Unblock the reader if generation fails before the streamer ends
+    task.add_done_callback(lambda _: chunks.put_nowait(None))
+    
+    async def body():
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                yield chunk
+            await task
+            logger.info("✓ Streamed successfully")
+        except Exception as e:
+            logger.error(f"Streaming generation failed: {e}")
+        finally:
+            if not task.done():
+                # The client went away mid-stream: stop the decode loop
+                task.cancel()
+                GENERATIONS_ABORTED.inc(reason="disconnect")
+                logger.info("Client disconnected, streaming generation aborted")
+            inference_executor.release()
+    
+    return StreamingResponse(body(), media_type="audio/wav")
+
+async def run_text_batch(key, prompts):
+    """Batch runner for the text batcher, keyed by (max_new_tokens, sampling params)"""
+    max_new_tokens, sampling = key
+    return await inference_executor.run(generate_text_batch, prompts, max_new_tokens, dict(sampling), cancellable=True)
+
+async def generate_cached(seed: Optional[int], generate, **key_fields):
+    """Serve seeded generations from the result cache; unseeded ones are always fresh"""
+    if result_cache is None or seed is None:
+        return await generate()
+    # int8 and bf16 output differs from fp32, and the disk cache outlives a precision change
+    key = cache_key(seed=seed, precision=PRECISION, **key_fields)
+    return await result_cache.get_or_generate(key, generate)
+
+class ClientDisconnected(Exception):
+    """The client went away before its generation finished"""
+
+async def abort_on_disconnect(http_request: Request, coro):
+    """Await `coro`, cancelling it (and the generation behind it) if the client disconnects first"""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait([task], timeout=DISCONNECT_POLL_S)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                task.cancel()
+                GENERATIONS_ABORTED.inc(reason="disconnect")
+                logger.info(f"Client disconnected, {http_request.url.path} generation aborted")
+                raise ClientDisconnected()
+    except asyncio.CancelledError:
+        task.cancel()
         raise
 
+@app.exception_handler(ClientDisconnected)
+async def client_disconnected_handler(request, exc: ClientDisconnected):
+    """Nobody is listening; 499 (client closed request) only shows up in access logs"""
+    return Response(status_code=499)
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request, exc: ExecutorSaturated):
+    """Reject quickly when the inference queue is full"""
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "error": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(AudioIngestError)
+async def audio_ingest_error_handler(request, exc: AudioIngestError):
+    """Reject uploads that are too large, too long or not decodable"""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"success": False, "error": str(exc)}
+    )
+
+def job_status(job) -> dict:
+    """Status payload for a job, with its queue position or result URL"""
+    status = job.to_dict()
+    status["queue_position"] = job_queue.queue_position(job)
+    if job.status == SUCCEEDED:
+        status["result_url"] = f"/jobs/{job.id}/result"
+    return status
+
+def get_job_or_404(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.on_event("startup")
+async def start_batcher():
+    """Set up request batching and load models in the background, so /health answers right away"""
+    global text_batcher
+    
+    presets = []
+    if PRESET_PROMPTS_FILE:
+        with open(PRESET_PROMPTS_FILE, encoding="utf-8") as f:
+            presets = [line.strip() for line in f if line.strip()]
+    
+    if isinstance(inference_executor, ReplicaPool):
+        # Keep the parent single-threaded so forked replicas start from a clean OpenMP state
+        torch.set_num_threads(1)
+    
+    text_batcher = GenerationBatcher(
+        run_text_batch,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_WINDOW_MS
+    )
+    job_queue.start()
+    asyncio.ensure_future(load_and_warm_up(presets))
+
+async def load_and_warm_up(presets):
+    """Preload models, encode presets and run a warmup generate, then report ready"""
+    loop = asyncio.get_running_loop()
+    try:
+        startup["phase"] = "loading"
+        for name in PRELOAD_MODELS:
+            await loop.run_in_executor(None, preload_model, name)
+            startup["models_loaded"] += 1
+        
+        if presets:
+            logger.info(f"Pre-warming text encoder cache with {len(presets)} preset prompts")
+        if isinstance(inference_executor, ReplicaPool):
+            # Shared models and preset encodings are in place before forking
+            await loop.run_in_executor(None, prewarm_text_cache, presets)
+            await loop.run_in_executor(None, inference_executor.start)
+        elif presets:
+            await inference_executor.run(prewarm_text_cache, presets)
+        
+        startup["phase"] = "warming_up"
+        if WARMUP_STEPS > 0 and PRELOAD_MODELS:
+            # Every replica pays its own lazy initialization, so warm each one
+            await inference_executor.run_on_all(warmup_models, PRELOAD_MODELS)
+    except Exception as e:
+        logger.error(f"Startup failed: {e}")
+        import traceback
+        traceback.print_exc()
+        startup["phase"] = "failed"
+        startup["error"] = str(e)
+        return
+    
+    startup["ready_seconds"] = round(time.time() - PROCESS_START, 2)
+    startup["phase"] = "ready"
+    logger.info(f"MusicGen server ready {startup['ready_seconds']}s after process start (CPU)")
+
+class FirstRequestTimer:
+    """ASGI middleware recording cold start to the first successfully served generation"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if (
+            startup["first_request_seconds"] is not None
+            or scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith(("/generate", "/jobs"))
+        ):
+            return await self.app(scope, receive, send)
+        
+        async def send_and_record(message):
+            if (
+                message["type"] == "http.response.start"
+                and message["status"] < 400
+                and startup["first_request_seconds"] is None
+            ):
+                startup["first_request_seconds"] = round(time.time() - PROCESS_START, 2)
+                logger.info(f"First request served {startup['first_request_seconds']}s after process start")
+            await send(message)
+        
+        await self.app(scope, receive, send_and_record)
+
+app.add_middleware(FirstRequestTimer)
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    await job_queue.stop()
+    inference_executor.shutdown()
+
+def queue_depths() -> dict:
+    return {
+        "batcher": text_batcher.pending_count() if text_batcher is not None else 0,
+        "jobs": job_queue.stats()["queued"]
+    }
+
+REGISTRY.gauge("musicgen_queue_depth", "Requests waiting to be scheduled", ("queue",), queue_depths)
+REGISTRY.gauge(
+    "musicgen_inflight_requests",
+    "Requests holding an inference admission slot (queued or running)",
+    callback=lambda: inference_executor.stats()["pending"]
+)
+REGISTRY.gauge(
+    "musicgen_inference_running",
+    "Calls currently executing on inference workers or replicas",
+    callback=lambda: inference_executor.stats()["running"]
+)
+REGISTRY.gauge(
+    "musicgen_cold_start_seconds",
+    "Seconds from process start to ready and to the first served generation",
+    ("milestone",),
+    lambda: {"ready": startup["ready_seconds"], "first_request": startup["first_request_seconds"]}
+)
+REGISTRY.gauge(
+    "musicgen_model_resident_bytes",
+    "Weights held by the model registry of the API process",
+    callback=model_registry.resident_bytes
+)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text-format metrics"""
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get('/health')
 def health_check():
     """Health check endpoint"""
     return {
         "status": "running",
-        "models": {
-            "text_to_music": "facebook/musicgen-small",
-            "melody_to_music": "facebook/musicgen-melody"
-        },
-        "ready": text_model is not None and melody_model is not None
+        "models": model_registry.status(),
+        "ready": startup["phase"] == "ready",
+        "startup": startup,
+        "precision": PRECISION,
+        "inference": inference_executor.stats(),
+        "jobs": job_queue.stats(),
+        "cache": result_cache.stats() if result_cache is not None else None,
+        "melody_cache": melody_feature_cache.stats() if melody_feature_cache is not None else None,
+        "text_cache": text_encoder_cache.stats() if text_encoder_cache is not None else None
     }
 
 @app.post("/generate", response_model=GenerateResponse)
-async def generate_music(request: GenerateRequest):
+async def generate_music(request: GenerateRequest, http_request: Request):
     """Generate music from text prompt"""
-    global text_model, text_processor
-    
-    if text_model is None or text_processor is None:
-        raise HTTPException(status_code=503, detail="Model not loaded")
+    if text_batcher is None:
+        raise HTTPException(status_code=503, detail="Server starting")
     
     try:
         logger.info(f"Text→Music: '{request.prompt}' ({request.duration}s)")
         
-        # Process input
-        inputs = text_processor(
-            text=[request.prompt],
-            padding=True,
-            return_tensors="pt"
-        )
-        
         # Calculate max tokens based on duration
         max_new_tokens = int(request.duration * 50)
+        sampling = sampling_params(request.temperature, request.top_k, request.top_p, request.guidance_scale)
         
-        # Generate audio
-        audio_values = text_model.generate(**inputs, max_new_tokens=max_new_tokens)
-        
-        # Get sampling rate
-        sampling_rate = text_model.config.audio_encoder.sampling_rate
+        async def generate():
+            with inference_executor.admission():
+                if request.seed is not None:
+                    # Seeded requests run alone so the output does not depend on batch-mates
+                    results = await inference_executor.run(
+                        generate_text_batch, [request.prompt], max_new_tokens, sampling, request.seed,
+                        cancellable=True
+                    )
+                    return results[0]
+                # Batched with concurrent requests of the same length and sampling params
+                return await text_batcher.submit(
+                    (max_new_tokens, tuple(sorted(sampling.items()))),
+                    request.prompt
+                )
         
-        # Convert to WAV in memory
-        buffer = io.BytesIO()
-        scipy.io.wavfile.write(buffer, sampling_rate, audio_values[0, 0].cpu().numpy())
-        buffer.seek(0)
+        audio, sampling_rate = await abort_on_disconnect(http_request, generate_cached(
+            request.seed,
+            generate,
+            model=MUSICGEN_MODELS["text"],
+            prompt=request.prompt,
+            max_new_tokens=max_new_tokens,
+            sampling=sampling
+        ))
         
-        audio_base64 = base64.b64encode(buffer.read()).decode('utf-8')
+        response = audio_response(audio, sampling_rate, request.response_format, request.sample_format)
         
         logger.info("✓ Generated successfully")
         
-        return GenerateResponse(
-            success=True,
-            audio_base64=audio_base64
-        )
+        return response
         
+    except (ExecutorSaturated, AudioIngestError, ClientDisconnected):
+        raise
     except Exception as e:
         logger.error(f"Error generating music: {str(e)}")
         import traceback
         traceback.print_exc()
-        return GenerateResponse(
-            success=False,
-            error=str(e)
-        )
+        return error_response(str(e), request.response_format)
 
 @app.post("/generate-from-melody", response_model=GenerateResponse)
 async def generate_from_melody(
+    http_request: Request,
     audio_file: UploadFile = File(...),
     prompt: str = Form(""),
-    duration: float = Form(10.0)
+    duration: float = Form(10.0),
+    seed: Optional[int] = Form(None),
+    temperature: Optional[float] = Form(None),
+    top_k: Optional[int] = Form(None),
+    top_p: Optional[float] = Form(None),
+    guidance_scale: Optional[float] = Form(None),
+    response_format: Literal["json", "wav", "flac", "ogg"] = Form("json"),
+    sample_format: Optional[Literal["int16", "float32"]] = Form(None)
 ):
     """Generate music from humming/melody audio"""
-    global melody_model, melody_processor
-    
-    if melody_model is None or melody_processor is None:
-        raise HTTPException(status_code=503, detail="Melody model not loaded")
-    
     try:
         logger.info(f"Melody→Music: '{prompt}' ({duration}s)")
         
         # Read uploaded audio
-        audio_bytes = await audio_file.read()
-        
-        # Save to temp file (needed for audio loading)
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as tmp_file:
-            tmp_file.write(audio_bytes)
-            tmp_path = tmp_file.name
-        
-        try:
-            # Use librosa if available (handles all formats without ffmpeg)
-            if HAS_LIBROSA:
-                audio_data, sample_rate = librosa.load(tmp_path, sr=None, mono=True)
-                logger.info(f"Loaded with librosa: {sample_rate}Hz, {len(audio_data)} samples")
-            else:
-                # Fallback to scipy (WAV only)
-                sample_rate, audio_data = scipy.io.wavfile.read(tmp_path)
-                
-                # Normalize
-                if audio_data.dtype == 'int16':
-                    audio_data = audio_data.astype('float32') / 32768.0
-                elif audio_data.dtype == 'int32':
-                    audio_data = audio_data.astype('float32') / 2147483648.0
-                
-                # Stereo to mono
-                if len(audio_data.shape) > 1:
-                    audio_data = audio_data.mean(axis=1)
-        finally:
-            # Windows fix: try to delete, ignore if locked
-            try:
-                os.unlink(tmp_path)
-            except PermissionError:
-                pass  # File will be cleaned up by OS eventually
+        audio_bytes = await read_audio_upload(audio_file)
         
-        # Ensure audio_data is standard numpy array with float32
-        if isinstance(audio_data, torch.Tensor):
-            audio_data = audio_data.numpy()
-        audio_data = np.array(audio_data, dtype=np.float32)
+        sampling = sampling_params(temperature, top_k, top_p, guidance_scale)
         
-        # Ensure mono (1D array)
-        if len(audio_data.shape) > 1:
-            audio_data = audio_data.mean(axis=0)
+        async def generate():
+            # Decode, resample and generate on an inference worker
+            with inference_executor.admission():
+                return await inference_executor.run(
+                    generate_melody, audio_bytes, prompt, duration, sampling, seed,
+                    cancellable=True
+                )
         
-        logger.info(f"Audio shape before resample: {audio_data.shape}, dtype: {audio_data.dtype}")
+        audio, sampling_rate = await abort_on_disconnect(http_request, generate_cached(
+            seed,
+            generate,
+            model=MUSICGEN_MODELS["melody"],
+            prompt=prompt,
+            max_new_tokens=int(duration * 50),
+            sampling=sampling,
+            melody_sha256=hashlib.sha256(audio_bytes).hexdigest()
+        ))
         
-        # Resample to model's expected rate (32kHz for MusicGen)
-        target_sr = melody_model.config.audio_encoder.sampling_rate
-        if sample_rate != target_sr:
-            audio_data = librosa.resample(audio_data, orig_sr=float(sample_rate), target_sr=float(target_sr))
-            sample_rate = target_sr
-            logger.info(f"Resampled to {target_sr}Hz")
-        
-        # Ensure sample_rate is Python int (not numpy)
-        sample_rate = int(sample_rate)
-        
-        # Ensure 1D array
-        audio_data = np.squeeze(audio_data)
-        logger.info(f"Final audio shape: {audio_data.shape}, sample_rate: {sample_rate}")
-        
-        # Process inputs with melody processor
-        if prompt:
-            # With text prompt
-            inputs = melody_processor(
-                audio=audio_data,
-                sampling_rate=sample_rate,
-                text=[prompt],
-                padding=True,
-                return_tensors="pt"
-            )
-        else:
-            # Audio only
-            inputs = melody_processor(
-                audio=audio_data,
-                sampling_rate=sample_rate,
-                padding=True,
-                return_tensors="pt"
-            )
-        
-        # Ensure correct key names for model
-        if 'input_features' in inputs:
-            inputs['input_values'] = inputs.pop('input_features')
-        
-        max_new_tokens = int(duration * 50)
-        
-        # Generate
-        audio_values = melody_model.generate(**inputs, max_new_tokens=max_new_tokens)
-        
-        # Convert to WAV
-        sampling_rate = melody_model.config.audio_encoder.sampling_rate
-        buffer = io.BytesIO()
-        scipy.io.wavfile.write(buffer, sampling_rate, audio_values[0, 0].cpu().numpy())
-        buffer.seek(0)
-        
-        audio_base64 = base64.b64encode(buffer.read()).decode('utf-8')
+        response = audio_response(audio, sampling_rate, response_format, sample_format)
         
         logger.info("✓ Generated successfully")
         
-        return GenerateResponse(
-            success=True,
-            audio_base64=audio_base64
-        )
+        return response
         
+    except (ExecutorSaturated, AudioIngestError, ClientDisconnected):
+        raise
     except Exception as e:
         logger.error(f"Melody generation failed: {e}")
         import traceback
         traceback.print_exc()
-        return GenerateResponse(
-            success=False,
-            error=str(e)
+        return error_response(str(e), response_format)
+
+@app.post("/generate-stream")
+async def generate_music_stream(request: GenerateRequest):
+    """Generate music from text prompt, streaming 16-bit WAV audio as it is decoded"""
+    logger.info(f"Text→Music (stream): '{request.prompt}' ({request.duration}s)")
+    
+    return audio_stream_response(
+        stream_text,
+        request.prompt,
+        int(request.duration * 50),
+        sampling_params(request.temperature, request.top_k, request.top_p, request.guidance_scale),
+        request.seed
+    )
+
+@app.post("/generate-from-melody-stream")
+async def generate_from_melody_stream(
+    audio_file: UploadFile = File(...),
+    prompt: str = Form(""),
+    duration: float = Form(10.0),
+    seed: Optional[int] = Form(None),
+    temperature: Optional[float] = Form(None),
+    top_k: Optional[int] = Form(None),
+    top_p: Optional[float] = Form(None),
+    guidance_scale: Optional[float] = Form(None)
+):
+    """Generate music from humming/melody audio, streaming 16-bit WAV audio as it is decoded"""
+    logger.info(f"Melody→Music (stream): '{prompt}' ({duration}s)")
+    
+    audio_bytes = await read_audio_upload(audio_file)
+    
+    return audio_stream_response(
+        stream_melody,
+        audio_bytes,
+        prompt,
+        int(duration * 50),
+        sampling_params(temperature, top_k, top_p, guidance_scale),
+        seed
+    )
+
+@app.post("/prewarm")
+async def prewarm(request: PrewarmRequest):
+    """Encode a library of preset prompts into the text encoder cache (on every replica)"""
+    if text_encoder_cache is None:
+        raise HTTPException(status_code=409, detail="Text encoder cache is disabled")
+    
+    await inference_executor.run_on_all(prewarm_text_cache, request.prompts, request.models)
+    return {"success": True, "prompts": len(request.prompts), "models": request.models}
+
+@app.post("/jobs")
+async def create_job(request: GenerateRequest):
+    """Queue a text-to-music generation and return its job id immediately"""
+    max_new_tokens = int(request.duration * 50)
+    sampling = sampling_params(request.temperature, request.top_k, request.top_p, request.guidance_scale)
+    
+    async def run(job):
+        async def generate():
+            return await inference_executor.run(
+                generate_text_job,
+                request.prompt,
+                max_new_tokens,
+                sampling,
+                request.seed,
+                emit=job.report_steps,
+                cancellable=True
+            )
+        
+        return await generate_cached(
+            request.seed,
+            generate,
+            model=MUSICGEN_MODELS["text"],
+            prompt=request.prompt,
+            max_new_tokens=max_new_tokens,
+            sampling=sampling
+        )
+    
+    job = await job_queue.submit(
+        "text",
+        run,
+        cost=request.duration,
+        params=request.model_dump(),
+        total_steps=max_new_tokens
+    )
+    logger.info(f"Job {job.id} queued: Text→Music '{request.prompt}' ({request.duration}s)")
+    return job_status(job)
+
+@app.post("/jobs/melody")
+async def create_melody_job(
+    audio_file: UploadFile = File(...),
+    prompt: str = Form(""),
+    duration: float = Form(10.0),
+    seed: Optional[int] = Form(None),
+    temperature: Optional[float] = Form(None),
+    top_k: Optional[int] = Form(None),
+    top_p: Optional[float] = Form(None),
+    guidance_scale: Optional[float] = Form(None),
+    response_format: Literal["json", "wav", "flac", "ogg"] = Form("json"),
+    sample_format: Optional[Literal["int16", "float32"]] = Form(None)
+):
+    """Queue a melody-to-music generation and return its job id immediately"""
+    audio_bytes = await read_audio_upload(audio_file)
+    sampling = sampling_params(temperature, top_k, top_p, guidance_scale)
+    max_new_tokens = int(duration * 50)
+    
+    async def run(job):
+        async def generate():
+            return await inference_executor.run(
+                generate_melody_job,
+                audio_bytes,
+                prompt,
+                duration,
+                sampling,
+                seed,
+                emit=job.report_steps,
+                cancellable=True
+            )
+        
+        return await generate_cached(
+            seed,
+            generate,
+            model=MUSICGEN_MODELS["melody"],
+            prompt=prompt,
+            max_new_tokens=max_new_tokens,
+            sampling=sampling,
+            melody_sha256=hashlib.sha256(audio_bytes).hexdigest()
+        )
+    
+    job = await job_queue.submit(
+        "melody",
+        run,
+        cost=duration,
+        params={
+            "prompt": prompt,
+            "duration": duration,
+            "seed": seed,
+            **sampling,
+            "response_format": response_format,
+            "sample_format": sample_format
+        },
+        total_steps=max_new_tokens
+    )
+    logger.info(f"Job {job.id} queued: Melody→Music '{prompt}' ({duration}s)")
+    return job_status(job)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status and progress"""
+    return job_status(get_job_or_404(job_id))
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(
+    job_id: str,
+    response_format: Optional[Literal["json", "wav", "flac", "ogg"]] = None,
+    sample_format: Optional[Literal["int16", "float32"]] = None
+):
+    """Generated audio of a finished job, in the job's response format unless overridden"""
+    job = get_job_or_404(job_id)
+    if job.status != SUCCEEDED:
+        return JSONResponse(
+            status_code=409,
+            content={"success": False, "error": f"Job is {job.status}", "status": job.status}
         )
+    
+    audio, sampling_rate = job.result
+    return audio_response(
+        audio,
+        sampling_rate,
+        response_format or job.params["response_format"],
+        sample_format or job.params["sample_format"]
+    )
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job; a running generation stops at its next decoder step"""
+    job = get_job_or_404(job_id)
+    if job.status == RUNNING:
+        GENERATIONS_ABORTED.inc(reason="cancelled")
+    job_queue.cancel(job_id)
+    return job_status(job)
+
+@app.post("/generate-long")
+async def generate_music_long(request: GenerateRequest):
+    """Generate a track longer than one model window, streaming 16-bit WAV audio window by window"""
+    if request.duration > LONG_MAX_DURATION_S:
+        raise HTTPException(
+            status_code=400,
+            detail=f"duration must be at most {LONG_MAX_DURATION_S:g}s"
+        )
+    
+    logger.info(f"Text→Music (long): '{request.prompt}' ({request.duration}s)")
+    
+    return audio_stream_response(
+        stream_long,
+        request.prompt,
+        int(request.duration * 50),
+        sampling_params(request.temperature, request.top_k, request.top_p, request.guidance_scale),
+        request.seed
+    )
 
 if __name__ == "__main__":
     import uvicorn
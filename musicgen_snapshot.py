@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Local Model Snapshots for MusicGen
+Exports models to a local directory (safetensors weights plus config and
+processor files) and loads them back with the weights memory-mapped, so a
+cold start reads no more of the file than generation touches and several
+server processes share one copy of the weights in the page cache.
+
+Usage:
+    python musicgen_snapshot.py --output snapshots
+    python musicgen_snapshot.py --output snapshots facebook/musicgen-small
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Optional
+
+import torch
+
+WEIGHTS_NAME = "model.safetensors"
+
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool
+}
+
+
+def snapshot_path(snapshot_dir: str, repo_id: str) -> str:
+    """Directory holding the snapshot of `repo_id` under `snapshot_dir`"""
+    return os.path.join(snapshot_dir, repo_id.replace("/", "--"))
+
+
+def has_snapshot(path: Optional[str]) -> bool:
+    return bool(path) and os.path.isfile(os.path.join(path, WEIGHTS_NAME))
+
+
+def export_snapshot(repo_id: str, path: str, model_class=None):
+    """Download `repo_id` and save it as a single-file safetensors snapshot at `path`"""
+    from transformers import AutoProcessor, MusicgenForConditionalGeneration
+
+    model_class = model_class or MusicgenForConditionalGeneration
+    model = model_class.from_pretrained(repo_id)
+    processor = AutoProcessor.from_pretrained(repo_id)
+    # One shard, so the loader maps a single file
+    model.save_pretrained(path, safe_serialization=True, max_shard_size="1000GB")
+    processor.save_pretrained(path)
+    return path
+
+
+def mmap_safetensors(filename: str) -> dict:
+    """
+    Tensors of a safetensors file as views of a private memory map.
+
+    Nothing is read up front; pages are faulted in on first use and stay
+    shared with the page cache until written to (copy-on-write).
+    """
+    with open(filename, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    header_size = struct.unpack_from("<Q", buffer, 0)[0]
+    header = json.loads(buffer[8:8 + header_size])
+    data_start = 8 + header_size
+
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        if end == begin:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        tensors[name] = torch.frombuffer(
+            buffer,
+            dtype=dtype,
+            count=(end - begin) // dtype.itemsize,
+            offset=data_start + begin
+        ).reshape(info["shape"])
+    return tensors
+
+
+def load_snapshot(path: str, model_class=None):
+    """Load `(model, processor)` from a snapshot directory with memory-mapped weights"""
+    from transformers import AutoConfig, AutoProcessor, GenerationConfig, MusicgenForConditionalGeneration
+    from transformers.modeling_utils import no_init_weights
+
+    model_class = model_class or MusicgenForConditionalGeneration
+    config = AutoConfig.from_pretrained(path)
+    # Skip random initialization: every weight is replaced by the mapped one
+    with no_init_weights():
+        model = model_class(config)
+
+    state_dict = mmap_safetensors(os.path.join(path, WEIGHTS_NAME))
+    result = model.load_state_dict(state_dict, strict=False, assign=True)
+    model.tie_weights()
+
+    # Tied weights are saved once; anything else missing is a broken snapshot
+    loaded = {tensor.data_ptr() for tensor in state_dict.values()}
+    params = model.state_dict()
+    missing = [k for k in result.missing_keys if params[k].data_ptr() not in loaded]
+    if missing or result.unexpected_keys:
+        raise ValueError(
+            f"Snapshot at {path} does not match {model_class.__name__}: "
+            f"missing {missing[:5]}, unexpected {result.unexpected_keys[:5]}"
+        )
+
+    model.eval()
+    # Sampling defaults and special token ids live in generation_config.json
+    if os.path.isfile(os.path.join(path, "generation_config.json")):
+        model.generation_config = GenerationConfig.from_pretrained(path)
+    processor = AutoProcessor.from_pretrained(path)
+    return model, processor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("repo_ids", nargs="*", default=["facebook/musicgen-small", "facebook/musicgen-melody"])
+    parser.add_argument("--output", required=True, help="Snapshot directory (MUSICGEN_SNAPSHOT_DIR)")
+    args = parser.parse_args()
+
+    for repo_id in args.repo_ids:
+        path = snapshot_path(args.output, repo_id)
+        print(f"Exporting {repo_id} to {path}...")
+        start = time.perf_counter()
+        export_snapshot(repo_id, path)
+        print(f"✓ {repo_id} exported in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Audio output for MusicGen
+Decodes audio incrementally while tokens are still being generated, and
+encodes waveforms as WAV (streamed or whole) or compressed audio.
+"""
+
+import io
+import struct
+from typing import Callable, Optional
+
+import numpy as np
+import torch
+from transformers.generation.streamers import BaseStreamer
+
+try:
+    import soundfile
+    HAS_SOUNDFILE = True
+except ImportError:
+    HAS_SOUNDFILE = False
+
+# Response containers and their media types
+AUDIO_MEDIA_TYPES = {
+    "wav": "audio/wav",
+    "flac": "audio/flac",
+    "ogg": "audio/ogg"
+}
+
+
+class MusicgenAudioStreamer(BaseStreamer):
+    """
+    Streamer that turns MusicGen codebook tokens into audio chunks.
+
+    Every `play_steps` decoder steps the cached tokens are run through the
+    audio decoder and the newly finalized samples are handed to `on_audio`.
+    The last `stride` samples are held back because they still change as
+    more tokens arrive. `on_audio(None)` signals the end of the stream.
+    Only batch size 1 is supported.
+    """
+
+    def __init__(
+        self,
+        model,
+        on_audio: Callable[[Optional[np.ndarray]], None],
+        play_steps: int = 50,
+        stride: Optional[int] = None
+    ):
+        self.decoder = model.decoder
+        self.audio_encoder = model.audio_encoder
+        self.generation_config = model.generation_config
+        self.on_audio = on_audio
+        self.play_steps = play_steps
+
+        if stride is not None:
+            self.stride = stride
+        else:
+            hop_length = int(np.prod(self.audio_encoder.config.upsampling_ratios))
+            self.stride = hop_length * (play_steps - self.decoder.num_codebooks) // 6
+
+        self.token_cache = None
+        self.to_yield = 0
+
+    def decode_tokens(self, input_ids: torch.Tensor) -> np.ndarray:
+        """Undo the delay pattern on the cached tokens and decode them to audio"""
+        _, delay_pattern_mask = self.decoder.build_delay_pattern_mask(
+            input_ids[:, :1],
+            pad_token_id=self.generation_config.decoder_start_token_id,
+            max_length=input_ids.shape[-1]
+        )
+        input_ids = self.decoder.apply_delay_pattern_mask(input_ids, delay_pattern_mask)
+        input_ids = input_ids[input_ids != self.generation_config.pad_token_id].reshape(
+            1, self.decoder.num_codebooks, -1
+        )
+        input_ids = input_ids[None, ...].to(self.audio_encoder.device)
+
+        with torch.no_grad():
+            output_values = self.audio_encoder.decode(input_ids, audio_scales=[None])
+        return output_values.audio_values[0, 0].cpu().float().numpy()
+
+    def put(self, value: torch.Tensor):
+        if value.shape[0] // self.decoder.num_codebooks > 1:
+            raise ValueError("MusicgenAudioStreamer only supports batch size 1")
+
+        if value.dim() == 1:
+            value = value[:, None]
+
+        if self.token_cache is None:
+            self.token_cache = value
+        else:
+            self.token_cache = torch.cat([self.token_cache, value], dim=-1)
+
+        if self.token_cache.shape[-1] % self.play_steps == 0:
+            audio_values = self.decode_tokens(self.token_cache)
+            end = len(audio_values) - self.stride
+            if end > self.to_yield:
+                self.on_audio(audio_values[self.to_yield:end])
+                self.to_yield = end
+
+    def end(self):
+        if self.token_cache is not None:
+            audio_values = self.decode_tokens(self.token_cache)
+            if len(audio_values) > self.to_yield:
+                self.on_audio(audio_values[self.to_yield:])
+        self.on_audio(None)
+
+
+def wav_header(
+    sample_rate: int,
+    data_bytes: Optional[int] = None,
+    sample_format: str = "int16",
+    channels: int = 1
+) -> bytes:
+    """
+    Canonical 44-byte WAV header for PCM int16 or IEEE float32 samples.
+
+    With `data_bytes=None` the RIFF and data chunk sizes are set to
+    0xFFFFFFFF, which browsers and most decoders accept as "read until end
+    of stream".
+    """
+    format_tag, bits_per_sample = (3, 32) if sample_format == "float32" else (1, 16)
+    byte_rate = sample_rate * channels * bits_per_sample // 8
+    block_align = channels * bits_per_sample // 8
+    riff_size = 0xFFFFFFFF if data_bytes is None else 36 + data_bytes
+    data_size = 0xFFFFFFFF if data_bytes is None else data_bytes
+    return b"".join([
+        b"RIFF", struct.pack("<I", riff_size), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, format_tag, channels, sample_rate, byte_rate, block_align, bits_per_sample),
+        b"data", struct.pack("<I", data_size)
+    ])
+
+
+def wav_stream_header(sample_rate: int, channels: int = 1) -> bytes:
+    """WAV header for a 16-bit PCM stream of unknown length"""
+    return wav_header(sample_rate, None, "int16", channels)
+
+
+def float_to_pcm16(audio: np.ndarray) -> bytes:
+    """Convert float audio in [-1, 1] to little-endian 16-bit PCM bytes"""
+    audio = np.clip(audio, -1.0, 1.0)
+    return (audio * 32767.0).astype("<i2").tobytes()
+
+
+def encode_audio(
+    audio: np.ndarray,
+    sample_rate: int,
+    container: str = "wav",
+    sample_format: str = "int16"
+) -> bytes:
+    """
+    Encode a mono float waveform as a complete audio file.
+
+    WAV is assembled directly from the sample buffer (header plus raw
+    samples); FLAC and Ogg Vorbis need the optional soundfile package.
+    """
+    if container == "wav":
+        if sample_format == "float32":
+            data = np.ascontiguousarray(audio, dtype="<f4").tobytes()
+        else:
+            data = float_to_pcm16(audio)
+        return wav_header(sample_rate, len(data), sample_format) + data
+
+    if not HAS_SOUNDFILE:
+        raise ValueError(f"{container} output requires the soundfile package")
+
+    buffer = io.BytesIO()
+    subtype = "VORBIS" if container == "ogg" else ("PCM_16" if sample_format == "int16" else "PCM_24")
+    soundfile.write(buffer, audio, sample_rate, format=container.upper(), subtype=subtype)
+    return buffer.getvalue()
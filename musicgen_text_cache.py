@@ -0,0 +1,88 @@
+"""
+Text-encoder Output Cache for MusicGen
+Memoizes T5 encoder hidden states per normalized prompt, so recurring
+prompts (style presets, prompt iterations) skip tokenization and encoding.
+"""
+
+from typing import Iterable, List, Tuple
+
+import torch
+from transformers.modeling_outputs import BaseModelOutput
+
+from musicgen_cache import MemoryCache
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so trivially different prompts share an entry"""
+    return " ".join(prompt.split())
+
+
+class TextEncoderCache:
+    """
+    LRU cache of `(input_ids, attention_mask, hidden_states)` per prompt.
+
+    `generate_inputs()` returns kwargs for `model.generate()` that supply
+    `encoder_outputs` directly, so generate() skips its own text encoding.
+    The hidden states are stored unpadded and without the classifier-free
+    guidance half; both are rebuilt per batch. Call inside `torch.no_grad()`
+    and the configured precision context.
+    """
+
+    def __init__(self, max_bytes: int):
+        self._entries = MemoryCache(max_bytes)
+
+    def encode(self, model_name: str, model, processor, prompts: Iterable[str]) -> List[Tuple]:
+        """Cached encoder outputs for each prompt, encoding the misses in one batch"""
+        prompts = [normalize_prompt(p) for p in prompts]
+        found = {p: self._entries.get((model_name, p)) for p in dict.fromkeys(prompts)}
+        misses = [p for p, entry in found.items() if entry is None]
+
+        if misses:
+            inputs = processor(text=misses, padding=True, return_tensors="pt")
+            hidden = model.text_encoder(
+                input_ids=inputs["input_ids"],
+                attention_mask=inputs["attention_mask"]
+            ).last_hidden_state
+            for i, prompt in enumerate(misses):
+                # T5 pads on the right; keep only the real tokens
+                length = int(inputs["attention_mask"][i].sum())
+                entry = (
+                    inputs["input_ids"][i, :length].clone(),
+                    inputs["attention_mask"][i, :length].clone(),
+                    hidden[i, :length].clone()
+                )
+                self._entries.put((model_name, prompt), entry)
+                found[prompt] = entry
+
+        return [found[p] for p in prompts]
+
+    def generate_inputs(self, model_name: str, model, processor, prompts: List[str], guidance_scale=None) -> dict:
+        """Padded generate() kwargs with precomputed `encoder_outputs` for a batch of prompts"""
+        entries = self.encode(model_name, model, processor, prompts)
+        length = max(len(ids) for ids, _, _ in entries)
+        pad_token_id = processor.tokenizer.pad_token_id or 0
+
+        input_ids = torch.full((len(entries), length), pad_token_id, dtype=entries[0][0].dtype)
+        attention_mask = torch.zeros((len(entries), length), dtype=entries[0][1].dtype)
+        hidden = entries[0][2].new_zeros((len(entries), length, entries[0][2].shape[-1]))
+        for i, (ids, mask, states) in enumerate(entries):
+            input_ids[i, :len(ids)] = ids
+            attention_mask[i, :len(mask)] = mask
+            hidden[i, :len(states)] = states
+
+        if guidance_scale is None:
+            guidance_scale = model.generation_config.guidance_scale
+        if guidance_scale is not None and guidance_scale > 1:
+            # generate() expects the unconditional (null) half already appended
+            hidden = torch.cat([hidden, torch.zeros_like(hidden)], dim=0)
+            attention_mask = torch.cat([attention_mask, torch.zeros_like(attention_mask)], dim=0)
+
+        # input_ids are only used for the batch size once encoder_outputs are given
+        return {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "encoder_outputs": BaseModelOutput(last_hidden_state=hidden)
+        }
+
+    def stats(self) -> dict:
+        return self._entries.stats()